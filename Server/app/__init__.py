@@ -1,28 +1,68 @@
 from flask import Flask
-from flask_cors import CORS
 
-from app.extensions import db, migrate, jwt, mongo_service
+from app.extensions import db, jwt, mongo_service, user_cache, revocation_list
+from app.services.cache_service import response_cache
+from app.services.pool_service import configure_sqlite
+from app.services.password_service import password_hasher
+from app.services import json_service, serving_service
+from app.config import engine_options
 
 
-def create_app():
+def create_app(config=None, mode='web'):
+    """
+    mode='web' builds the full API. mode='worker' (Celery) only sets up the
+    database, caches and event logging, and skips blueprints, CORS, JWT,
+    Flask-Migrate and request metrics so workers boot faster.
+    """
     app = Flask(__name__)
     app.config.from_object('app.config.Config')
-    CORS(app)
+    if config:
+        app.config.update(config)
+    options, sqlite_pragmas = engine_options(app.config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', options)
+    configure_sqlite(sqlite_pragmas)
+    serving_service.init_app(app)
+    json_service.init_app(app)
 
     db.init_app(app)
-    migrate.init_app(app, db)
-    jwt.init_app(app)
     mongo_service.init_app(app)
+    response_cache.init_app(app)
+    if mode == 'worker':
+        return app
+
+    from flask_cors import CORS
+    from flask_migrate import Migrate
+    from app.services import compression_service, metrics_service
+
+    CORS(app)
+    Migrate(app, db)
+    jwt.init_app(app)
+    user_cache.init_app(app)
+    revocation_list.init_app(app)
+    password_hasher.init_app(app)
+    metrics_service.init_app(app)
+    compression_service.init_app(app)
 
     # Register Blueprints
     from app.routes.auth import auth_bp
     from app.routes.user import user_bp
     from app.routes.consumption import consumption_bp
     from app.routes.stats import stats_bp
+    from app.routes.health import health_bp
+    from app.routes.metrics import metrics_bp
+    from app.routes.dashboard import dashboard_bp
 
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(user_bp, url_prefix='/user')
     app.register_blueprint(consumption_bp, url_prefix='/consumption')
     app.register_blueprint(stats_bp, url_prefix='/stats')
+    app.register_blueprint(health_bp, url_prefix='/health')
+    app.register_blueprint(metrics_bp, url_prefix='/metrics')
+    app.register_blueprint(dashboard_bp, url_prefix='/dashboard')
+
+    from app.commands import rebuild_rollups_command, event_summary_command, maintain_partitions_command
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(event_summary_command)
+    app.cli.add_command(maintain_partitions_command)
 
     return app
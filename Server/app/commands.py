@@ -0,0 +1,44 @@
+import json
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('rebuild-rollups')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user.')
+@with_appcontext
+def rebuild_rollups_command(user_id):
+    """Recompute the daily consumption rollup from raw rows."""
+    from app.services.rollup_service import rebuild_rollups
+    written = rebuild_rollups(user_id)
+    click.echo(f'Wrote {written} rollup rows.')
+
+
+@click.command('event-summary')
+@click.option('--days', type=int, default=7, help='How far back to look.')
+@click.option('--window', type=click.Choice(['hour', 'day', 'month']), default='day')
+@click.option('--kind', type=click.Choice(['logins', 'requests']), default='logins')
+@with_appcontext
+def event_summary_command(days, window, kind):
+    """Print login or request event counts per window from MongoDB."""
+    from app.services.mongo_service import mongo_service
+    end = datetime.utcnow()
+    start = end - timedelta(days=days)
+    summary = mongo_service.login_summary if kind == 'logins' else mongo_service.request_summary
+    for row in summary(start, end, window):
+        click.echo(json.dumps(row))
+
+
+@click.command('maintain-partitions')
+@with_appcontext
+def maintain_partitions_command():
+    """Create upcoming consumption partitions and archive or purge old rows."""
+    from flask import current_app
+    from app.services.partition_service import run_maintenance
+    config = current_app.config
+    summary = run_maintenance(
+        months_ahead=config['CONSUMPTION_PARTITIONS_AHEAD'],
+        archive_after_months=config['CONSUMPTION_ARCHIVE_AFTER_MONTHS'],
+        debug_retention_days=config['CONSUMPTION_DEBUG_RETENTION_DAYS'],
+    )
+    click.echo(json.dumps(summary))
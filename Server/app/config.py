@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 from dotenv import load_dotenv
 
@@ -10,8 +11,118 @@ class Config:
         "postgresql://postgres:postgres@db:5432/iquit"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 'sync' (gthread workers) or 'gevent' (cooperative workers); also picks the
+    # gunicorn worker class in gunicorn.conf.py
+    SERVING_MODE = os.getenv("SERVING_MODE", "sync")
+    # Connection pool (server databases only; see engine_options)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Postgres statement_timeout in milliseconds, 0 disables it (keep it off for workers and migrations)
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    # SQLite (development) connection settings
+    DB_SQLITE_JOURNAL_MODE = os.getenv("DB_SQLITE_JOURNAL_MODE", "WAL")
+    DB_SQLITE_SYNCHRONOUS = os.getenv("DB_SQLITE_SYNCHRONOUS", "NORMAL")
+    DB_SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("DB_SQLITE_BUSY_TIMEOUT_MS", "5000"))
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "super-secret-key")
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv("JWT_REFRESH_TOKEN_DAYS", "30")))
+    # revoked tokens (logout, refresh rotation, profile changes): 'memory' (single process) or 'redis'
+    # 'redis' (shared by every worker) or 'memory' (one process only; gunicorn.conf.py refuses it with several workers)
+    TOKEN_REVOCATION_BACKEND = os.getenv("TOKEN_REVOCATION_BACKEND", "redis")
+    TOKEN_REVOCATION_REDIS_URL = os.getenv("TOKEN_REVOCATION_REDIS_URL", "redis://redis:6379/2")
+    # per-worker front for revocation lookups; misses are re-checked after TOKEN_REVOCATION_CACHE_TTL seconds
+    TOKEN_REVOCATION_CACHE_SIZE = int(os.getenv("TOKEN_REVOCATION_CACHE_SIZE", "10000"))
+    TOKEN_REVOCATION_CACHE_TTL = float(os.getenv("TOKEN_REVOCATION_CACHE_TTL", "30"))
+    # Password hashing: 'bcrypt' (cost = rounds) or 'pbkdf2' (cost = iterations).
+    # Existing hashes are upgraded on the next successful login when these change.
+    PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "bcrypt")
+    PASSWORD_HASH_COST = int(os.getenv("PASSWORD_HASH_COST", "0")) or None
+    # processes used for hashing, 0 hashes on the request thread
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "0")) or None
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
     DEBUG_FAKE_DATA = os.getenv("DEBUG_FAKE_DATA", "false").lower() == "true"
     CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
     CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
+    CELERY_TASK_ALWAYS_EAGER = os.getenv("CELERY_TASK_ALWAYS_EAGER", "false").lower() == "true"
+    # users per weekly report chunk task
+    WEEKLY_REPORT_CHUNK_SIZE = int(os.getenv("WEEKLY_REPORT_CHUNK_SIZE", "1000"))
+    MONGO_URI = os.getenv("MONGO_URI")
+    # MongoDB is connected lazily; writes give up after this long without a server
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000"))
+    # Event log pipeline: events are queued in-process and written in batches
+    MONGO_EVENT_BUFFERED = os.getenv("MONGO_EVENT_BUFFERED", "true").lower() == "true"
+    MONGO_EVENT_QUEUE_SIZE = int(os.getenv("MONGO_EVENT_QUEUE_SIZE", "10000"))
+    MONGO_EVENT_BATCH_SIZE = int(os.getenv("MONGO_EVENT_BATCH_SIZE", "100"))
+    MONGO_EVENT_FLUSH_INTERVAL = float(os.getenv("MONGO_EVENT_FLUSH_INTERVAL", "1.0"))
+    # 'drop' discards events when the queue is full, 'block' waits up to MONGO_EVENT_PUT_TIMEOUT
+    MONGO_EVENT_OVERFLOW = os.getenv("MONGO_EVENT_OVERFLOW", "drop")
+    MONGO_EVENT_PUT_TIMEOUT = float(os.getenv("MONGO_EVENT_PUT_TIMEOUT", "0.05"))
+    # 'ttl' keeps one events collection with a TTL index; 'monthly' writes events_YYYY_MM
+    # collections and the rotate_event_collections task drops expired months
+    MONGO_EVENT_ROTATION = os.getenv("MONGO_EVENT_ROTATION", "ttl")
+    MONGO_EVENT_RETENTION_DAYS = int(os.getenv("MONGO_EVENT_RETENTION_DAYS", "90"))
+    # current_user resolution cache (per worker)
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "4096"))
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+    # maximum entries accepted by POST /consumption/batch
+    CONSUMPTION_BATCH_MAX = int(os.getenv("CONSUMPTION_BATCH_MAX", "500"))
+    # response cache for stats endpoints: 'none', 'memory' (single process) or 'redis'
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "none")
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://redis:6379/1")
+    CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    # consumption partition maintenance (daily task): months of partitions created ahead,
+    # months after which rows move to consumption_archive, days debug rows are kept (0 disables)
+    CONSUMPTION_PARTITIONS_AHEAD = int(os.getenv("CONSUMPTION_PARTITIONS_AHEAD", "3"))
+    CONSUMPTION_ARCHIVE_AFTER_MONTHS = int(os.getenv("CONSUMPTION_ARCHIVE_AFTER_MONTHS", "12"))
+    CONSUMPTION_DEBUG_RETENTION_DAYS = int(os.getenv("CONSUMPTION_DEBUG_RETENTION_DAYS", "30"))
+    # largest page served by GET /consumption/history in JSON mode
+    HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "1000"))
+    # background exports are written here; share it between web and Celery containers
+    EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "iquit-exports"))
+    EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+    # finished and failed exports are deleted by the daily expire_exports task after this long
+    EXPORT_RETENTION_HOURS = int(os.getenv("EXPORT_RETENTION_HOURS", "24"))
+    # request instrumentation exposed at /metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", "500"))
+    # 'auto' encodes with orjson when installed, 'orjson' requires it, 'json' is the stdlib
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "auto")
+    # Accept-Encoding negotiated br/gzip for JSON, NDJSON and CSV responses
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+
+def engine_options(config):
+    """
+    Builds SQLALCHEMY_ENGINE_OPTIONS for the configured database URI.
+    Returns (options, sqlite_pragmas).
+    """
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite'):
+        pragmas = {
+            'busy_timeout': config['DB_SQLITE_BUSY_TIMEOUT_MS'],
+            'foreign_keys': 'ON',
+        }
+        if ':memory:' not in uri and uri not in ('sqlite://', 'sqlite:///'):
+            pragmas['journal_mode'] = config['DB_SQLITE_JOURNAL_MODE']
+            pragmas['synchronous'] = config['DB_SQLITE_SYNCHRONOUS']
+        return {}, pragmas
+    from app.services.pool_service import InstrumentedQueuePool
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    if uri.startswith('postgresql') and config['DB_STATEMENT_TIMEOUT_MS']:
+        options['connect_args'] = {'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    return options, {}
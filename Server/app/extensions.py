@@ -1,9 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
-from app.services.mongo_service import MongoService
+from app.services.mongo_service import mongo_service
+from app.services.user_cache import user_cache, load_current_user, user_lookup_error
+from app.services.token_service import revocation_list, token_in_blocklist
+from app.services.serving_service import session_scope
 
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'scopefunc': session_scope})
 jwt = JWTManager()
-mongo_service = MongoService()
+jwt.user_lookup_loader(load_current_user)
+jwt.user_lookup_error_loader(user_lookup_error)
+jwt.token_in_blocklist_loader(token_in_blocklist)
@@ -2,12 +2,66 @@ from datetime import datetime
 from app.extensions import db
 
 class Consumption(db.Model):
+    # On Postgres the table is range-partitioned by month on `timestamp` (primary
+    # key (id, timestamp), see the partition_consumption migration and
+    # app.services.partition_service); on SQLite it is a plain table. Filter on
+    # `timestamp` wherever possible so Postgres only scans the matching months.
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     substance_type = db.Column(db.String(50), nullable=False)
     quantity = db.Column(db.Float, nullable=False)
     unit = db.Column(db.String(20), nullable=False)
     cost = db.Column(db.Float, default=0.0)
     notes = db.Column(db.String(255))
     is_debug = db.Column(db.Boolean, default=False)
+    # client-generated key used to deduplicate offline replays (POST /consumption/batch)
+    idempotency_key = db.Column(db.String(64))
+
+    __table_args__ = (
+        # every read path filters on one user and a timestamp range
+        db.Index('ix_consumption_user_id_timestamp', 'user_id', 'timestamp'),
+        # real (non-debug) rows only; queries must filter on `is_debug == false()` to use it
+        db.Index('ix_consumption_live_user_id_timestamp', 'user_id', 'timestamp',
+                 postgresql_where=db.text('is_debug = false'),
+                 sqlite_where=db.text('is_debug = 0')),
+        # SQLite only: unique indexes on the partitioned Postgres table must contain the
+        # partition key, so there the migration creates a plain ix_consumption_user_id_idempotency_key
+        # and ConsumptionIdempotencyKey enforces the keys
+        db.Index('uq_consumption_user_id_idempotency_key', 'user_id', 'idempotency_key', unique=True),
+    )
+
+
+class ConsumptionArchive(db.Model):
+    """
+    Non-debug Consumption rows from months moved out of the live table by
+    partition_service.archive_months. Same ids and columns, without the debug flag
+    and idempotency key (ConsumptionIdempotencyKey keeps those), and a single index
+    for history and export reads.
+    """
+    __tablename__ = 'consumption_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    substance_type = db.Column(db.String(50), nullable=False)
+    quantity = db.Column(db.Float, nullable=False)
+    unit = db.Column(db.String(20), nullable=False)
+    cost = db.Column(db.Float)
+    notes = db.Column(db.String(255))
+
+    __table_args__ = (
+        db.Index('ix_consumption_archive_user_id_timestamp', 'user_id', 'timestamp'),
+    )
+
+
+class ConsumptionIdempotencyKey(db.Model):
+    """
+    Every idempotency key stored by log_consumption_batch, with the id of the row it
+    created. Written in the same transaction as the rows, so its primary key rejects
+    concurrent replays on every dialect (the partitioned Postgres table cannot), and
+    kept when rows are archived, so replaying an archived key stays a duplicate.
+    """
+    __tablename__ = 'consumption_idempotency_key'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    idempotency_key = db.Column(db.String(64), primary_key=True)
+    consumption_id = db.Column(db.Integer, nullable=False)
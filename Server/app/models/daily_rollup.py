@@ -0,0 +1,13 @@
+from app.extensions import db
+
+class DailyConsumptionRollup(db.Model):
+    """
+    Per-user, per-day, per-substance totals of Consumption rows.
+    Maintained on write by app.services.rollup_service and rebuilt with `flask rebuild-rollups`.
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    substance_type = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    quantity_sum = db.Column(db.Float, nullable=False, default=0.0)
+    cost_sum = db.Column(db.Float, nullable=False, default=0.0)
@@ -1,6 +1,6 @@
 from datetime import datetime
 from app.extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.services.password_service import password_hasher
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -8,10 +8,15 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(256))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # IANA zone name; day and week statistics follow the user's calendar
+    timezone = db.Column(db.String(64), nullable=False, default='UTC', server_default='UTC')
     consumptions = db.relationship('Consumption', backref='user', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
@@ -0,0 +1,40 @@
+from datetime import datetime
+from app.extensions import db
+
+class WeeklyReport(db.Model):
+    """
+    Precomputed Monday-to-Sunday totals per user, written by the weekly Celery job.
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    week_start = db.Column(db.Date, primary_key=True)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+    total_quantity = db.Column(db.Float, nullable=False, default=0.0)
+    total_cost = db.Column(db.Float, nullable=False, default=0.0)
+    average = db.Column(db.Float, nullable=False, default=0.0)
+    # seven daily counts, Monday first
+    daily_counts = db.Column(db.JSON, nullable=False)
+    generated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # analytics as of the week's last day (see analytics_service)
+    current_streak = db.Column(db.Integer)
+    longest_streak = db.Column(db.Integer)
+    rolling_7 = db.Column(db.Float)
+    rolling_30 = db.Column(db.Float)
+    trend_slope = db.Column(db.Float)
+    money_saved = db.Column(db.Float)
+
+    def to_dict(self):
+        return {
+            'week_start': self.week_start,
+            'total_count': self.total_count,
+            'total_quantity': self.total_quantity,
+            'total_cost': self.total_cost,
+            'average': self.average,
+            'daily_counts': self.daily_counts,
+            'generated_at': self.generated_at,
+            'current_streak': self.current_streak,
+            'longest_streak': self.longest_streak,
+            'rolling_7': self.rolling_7,
+            'rolling_30': self.rolling_30,
+            'trend_slope': self.trend_slope,
+            'money_saved': self.money_saved,
+        }
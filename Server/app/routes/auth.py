@@ -1,42 +1,58 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify
+from jwt import PyJWTError
+from sqlalchemy import or_
 from app.extensions import db
 from app.models.user import User
-from flask_jwt_extended import create_access_token
+from app.services.password_service import PasswordHasherBusy
+from app.services.timezone_service import DEFAULT_TIMEZONE, get_zone
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity, decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
 from app.services.mongo_service import mongo_service
+from app.services.auth_service import debug_user, is_debug_login, upgrade_password_hash
+from app.services.token_service import issue_tokens, revocation_list
 
 auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.errorhandler(PasswordHasherBusy)
+def hashing_busy(error):
+    return jsonify(message='Server busy, please retry'), 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json() or {}
     email = data.get('email')
     password = data.get('password')
     username = data.get('username')
+    tz_name = data.get('timezone') or DEFAULT_TIMEZONE
 
     if mongo_service:
         mongo_service.log_event('register_attempt', {'email': email, 'username': username})
 
     if not email or not password or not username:
         return jsonify(message='Missing email, password, or username'), 400
-    if User.query.filter_by(email=email).first() or User.query.filter_by(username=username).first():
-        return jsonify(message='User with this email or username already exists'), 409
+    try:
+        get_zone(tz_name)
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
     # Debug fake mode
-    if current_app.config.get('DEBUG_FAKE_DATA') and email == 'debug@iquit.dev':
-        # create or skip persistence
-        token = create_access_token(identity=email)
+    if is_debug_login(email):
+        tokens = issue_tokens(debug_user())
         if mongo_service:
             mongo_service.log_event('register_success_debug', {'email': email})
-        return jsonify(token=token), 200
-    user = User(email=email, username=username)
+        return jsonify(tokens), 200
+    taken = db.session.query(User.id).filter(or_(User.email == email, User.username == username)).first()
+    if taken:
+        return jsonify(message='User with this email or username already exists'), 409
+    user = User(email=email, username=username, timezone=tz_name)
     user.set_password(password)
     db.session.add(user)
     db.session.commit()
-    token = create_access_token(identity=email)
+    tokens = issue_tokens(user)
 
     if mongo_service:
-        mongo_service.log_event('register_success', {'email': email, 'user_id': user.id})
+        mongo_service.log_event('register_success', {'user_id': user.id})
 
-    return jsonify(token=token), 201
+    return jsonify(tokens), 201
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
@@ -50,17 +66,49 @@ def login():
     if not email or not password:
         return jsonify(message='Missing email or password'), 400
     # Debug fake mode
-    if current_app.config.get('DEBUG_FAKE_DATA') and email == 'debug@iquit.dev':
-        token = create_access_token(identity=email)
+    if is_debug_login(email):
+        user = debug_user()
         if mongo_service:
-            mongo_service.log_event('login_success_debug', {'email': email})
-        return jsonify(token=token), 200
+            mongo_service.log_event('login_success_debug', {'email': email, 'user_id': user.id})
+        return jsonify(issue_tokens(user)), 200
     user = User.query.filter_by(email=email).first()
     if not user or not user.check_password(password):
         if mongo_service:
-            mongo_service.log_event('login_failed', {'email': email})
+            # user_id only when the account exists (wrong password)
+            mongo_service.log_event('login_failed', {'email': email, 'user_id': user.id if user else None})
         return jsonify(message='Invalid credentials'), 401
-    token = create_access_token(identity=email)
+    upgrade_password_hash(user, password)
+    tokens = issue_tokens(user)
     if mongo_service:
         mongo_service.log_event('login_success', {'email': email, 'user_id': user.id})
-    return jsonify(token=token), 200
+    return jsonify(tokens), 200
+
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    # refresh tokens are single use: the presented one is revoked and a new pair issued
+    # with claims read fresh from the database
+    identity = get_jwt_identity()
+    user = db.session.get(User, int(identity)) if identity.isdigit() else None
+    if user is None:
+        return jsonify(message='User not found'), 404
+    revocation_list.revoke(get_jwt())
+    mongo_service.log_event('token_refresh', {'user_id': user.id})
+    return jsonify(issue_tokens(user)), 200
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    claims = get_jwt()
+    revocation_list.revoke(claims)
+    refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh_token:
+        try:
+            refresh_claims = decode_token(refresh_token)
+        except (PyJWTError, JWTExtendedException):
+            return jsonify(message='Invalid refresh token'), 400
+        if refresh_claims.get('type') != 'refresh' or refresh_claims['sub'] != claims['sub']:
+            return jsonify(message='Invalid refresh token'), 400
+        revocation_list.revoke(refresh_claims)
+    mongo_service.log_event('logout', {'user_id': claims['sub']})
+    return jsonify(message='Logged out'), 200
@@ -1,101 +1,210 @@
-from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.extensions import db
-from app.models.consumption import Consumption
-from app.models.user import User
+import re
+import uuid
+from flask import Blueprint, request, jsonify, current_app, send_file, stream_with_context
+from flask_jwt_extended import jwt_required, current_user
+from sqlalchemy.exc import IntegrityError
+from app.services import json_service
 from app.services.mongo_service import mongo_service
-from datetime import datetime, date, timedelta
+from app.services.cache_service import response_cache
+from app.services.aggregation_service import daily_counts, window_days
+from app.services.timezone_service import local_today, to_utc
+from app.services.export_service import (
+    EXPORT_FAILED, EXPORT_PENDING, STREAMING_FORMATS, find_export, format_available, iter_csv,
+    iter_export_rows, iter_ndjson, set_export_status
+)
+from app.services.consumption_service import (
+    parse_consumption, insert_consumption, log_consumption_batch, serialize_consumption,
+    day_entries, iter_history, encode_cursor, decode_cursor
+)
+from datetime import datetime
 
 consumption_bp = Blueprint('consumption', __name__)
 
 @consumption_bp.route('', methods=['POST'])
 @jwt_required()
 def log_consumption():
-    user_email = get_jwt_identity()
-    mongo_service.log_event('log_consumption_request', {'user_email': user_email})
     data = request.get_json() or {}
-    # Required fields
-    substance = data.get('substance_type')
-    quantity = data.get('quantity')
-    unit = data.get('unit')
-    cost = data.get('cost', 0.0)
-    timestamp = data.get('timestamp')
-    if not substance or quantity is None or not unit:
-        return jsonify(message='Missing fields'), 400
-    # parse timestamp if provided
-    if timestamp:
-        try:
-            ts = datetime.fromisoformat(timestamp)
-        except ValueError:
-            return jsonify(message='Invalid timestamp'), 400
+    try:
+        values = parse_consumption(data)
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+    entry_id = insert_consumption(current_user, values, current_user.is_debug)
+    response = jsonify(id=entry_id)
+    # one event, logged once the response has been sent
+    event = {'user_id': current_user.id, 'consumption_id': entry_id}
+    response.call_on_close(lambda: mongo_service.log_event('log_consumption_success', event))
+    return response, 201
+
+@consumption_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def log_consumption_batch_route():
+    limit = current_app.config.get('CONSUMPTION_BATCH_MAX', 500)
+    if request.mimetype == 'application/x-ndjson':
+        # one entry per line; a malformed line becomes an 'invalid' result
+        entries = []
+        for line in request.stream:
+            if not line.strip():
+                continue
+            if len(entries) == limit:
+                return jsonify(message=f'Too many entries, at most {limit} per batch'), 413
+            try:
+                entries.append(json_service.loads(line))
+            except ValueError:
+                entries.append(None)
     else:
-        ts = datetime.utcnow()
-    # debug flag
-    is_debug = current_app.config.get('DEBUG_FAKE_DATA') and user_email == 'debug@iquit.dev'
-    entry = Consumption(user_id=None,  # will set user_id below
-                        timestamp=ts,
-                        substance_type=substance,
-                        quantity=quantity,
-                        unit=unit,
-                        cost=cost,
-                        notes=data.get('notes'),
-                        is_debug=is_debug)
-    # associate user by email
-    user = User.query.filter_by(email=user_email).first()
-    if not user:
-        mongo_service.log_event('log_consumption_failure', {'user_email': user_email, 'reason': 'user_not_found'})
-        return jsonify(message='User not found'), 404
-    entry.user = user
-    db.session.add(entry)
-    db.session.commit()
-    mongo_service.log_event('log_consumption_success', {'user_email': user_email, 'consumption_id': entry.id})
-    return jsonify(id=entry.id), 201
+        data = request.get_json(silent=True)
+        entries = data.get('entries') if isinstance(data, dict) else data
+        if not isinstance(entries, list):
+            return jsonify(message='Expected a JSON array of entries or NDJSON'), 400
+        if len(entries) > limit:
+            return jsonify(message=f'Too many entries, at most {limit} per batch'), 413
+    try:
+        results = log_consumption_batch(current_user, entries, is_debug=current_user.is_debug)
+    except IntegrityError:
+        return jsonify(message='Concurrent replay of the same entries, please retry'), 503
+    summary = {status: sum(r['status'] == status for r in results) for status in ('created', 'duplicate', 'invalid')}
+    mongo_service.log_event('log_consumption_batch', dict(summary, user_id=current_user.id))
+    return jsonify(results=results, **summary), 200
 
 @consumption_bp.route('/today', methods=['GET'])
 @jwt_required()
 def get_today():
-    user_email = get_jwt_identity()
-    mongo_service.log_event('get_today_consumption_request', {'user_email': user_email})
-    today = date.today()
-    start = datetime.combine(today, datetime.min.time())
-    end = datetime.utcnow()
-    entries = Consumption.query.join(Consumption.user).filter(
-        User.email == user_email,
-        Consumption.timestamp >= start,
-        Consumption.timestamp <= end
-    ).all()
-    result = [
-        {
-            'id': e.id,
-            'timestamp': e.timestamp.isoformat(),
-            'substance_type': e.substance_type,
-            'quantity': e.quantity,
-            'unit': e.unit,
-            'cost': e.cost,
-            'notes': e.notes,
-            'is_debug': e.is_debug
-        }
-        for e in entries
-    ]
-    return jsonify(result), 200
+    mongo_service.log_event('get_today_consumption_request', {'user_id': current_user.id})
+    today = local_today(current_user.timezone)
+    return response_cache.respond('consumption_today', current_user.id,
+                                  lambda: day_entries(current_user.id, today, current_user.timezone), day=today)
 
 @consumption_bp.route('/weekly', methods=['GET'])
 @jwt_required()
 def get_weekly():
-    user_email = get_jwt_identity()
-    mongo_service.log_event('get_weekly_consumption_request', {'user_email': user_email})
-    today = date.today()
-    start_date = today - timedelta(days=6)
-    # aggregate per day
-    stats = []
-    for i in range(7):
-        day = start_date + timedelta(days=i)
-        day_start = datetime.combine(day, datetime.min.time())
-        day_end = datetime.combine(day, datetime.max.time())
-        count = Consumption.query.join(Consumption.user).filter(
-            User.email == user_email,
-            Consumption.timestamp >= day_start,
-            Consumption.timestamp <= day_end
-        ).count()
-        stats.append({'date': day.isoformat(), 'count': count})
-    return jsonify(stats), 200
+    mongo_service.log_event('get_weekly_consumption_request', {'user_id': current_user.id})
+    days = window_days(request.args.get('days', type=int))
+    today = local_today(current_user.timezone)
+    return response_cache.respond('consumption_weekly', current_user.id,
+                                  lambda: daily_counts(current_user.id, days, today, current_user.timezone),
+                                  variant=days, day=today)
+
+@consumption_bp.route('/history', methods=['GET'])
+@jwt_required()
+def get_history():
+    user_id = current_user.id
+    mongo_service.log_event('get_consumption_history_request', {'user_id': current_user.id})
+    fmt = request.args.get('format', 'json')
+    if fmt not in ('json', 'ndjson'):
+        return jsonify(message='Unsupported format'), 400
+    max_page = current_app.config.get('HISTORY_MAX_PAGE_SIZE', 1000)
+    limit = request.args.get('limit', type=int)
+    if fmt == 'json':
+        limit = min(max(limit or 100, 1), max_page)
+    elif limit is not None:
+        limit = max(limit, 1)
+    try:
+        before = decode_cursor(request.args['cursor']) if 'cursor' in request.args else None
+        start = _parse_time_arg('start')
+        end = _parse_time_arg('end')
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+
+    if fmt == 'ndjson':
+        # everything after the cursor (or up to `limit` rows), one entry per line
+        rows = iter_history(user_id, before, start, end, limit)
+
+        def generate_lines():
+            for row in rows:
+                yield json_service.dumps(serialize_consumption(row)) + b'\n'
+
+        return current_app.response_class(stream_with_context(generate_lines()), mimetype='application/x-ndjson')
+
+    # one page; the extra row only tells us whether there is a next page
+    rows = iter_history(user_id, before, start, end, limit + 1)
+
+    def generate_page():
+        yield b'{"items":['
+        last = None
+        for count, row in enumerate(rows):
+            if count == limit:
+                break
+            yield (b',' if last is not None else b'') + json_service.dumps(serialize_consumption(row))
+            last = row
+        else:
+            last = None
+        yield b'],"next_cursor":' + json_service.dumps(encode_cursor(last) if last is not None else None) + b'}'
+
+    return current_app.response_class(stream_with_context(generate_page()), mimetype='application/json')
+
+@consumption_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export():
+    """Streams the full history, oldest first, as CSV (default) or NDJSON."""
+    user_id = current_user.id
+    mongo_service.log_event('export_consumption_request', {'user_id': current_user.id})
+    fmt = request.args.get('format', 'csv')
+    if fmt not in STREAMING_FORMATS:
+        return jsonify(message='Unsupported format, use csv or ndjson (or POST for parquet)'), 400
+    try:
+        start = _parse_time_arg('start')
+        end = _parse_time_arg('end')
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+    chunk_size = current_app.config.get('EXPORT_CHUNK_SIZE', 1000)
+    rows = iter_export_rows(user_id, start, end, chunk_size)
+    body = iter_csv(rows, chunk_size) if fmt == 'csv' else iter_ndjson(rows)
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = current_app.response_class(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=consumption.{fmt}'
+    return response
+
+@consumption_bp.route('/export', methods=['POST'])
+@jwt_required()
+def start_export():
+    """Queues a background export; poll the returned URL until the file is ready."""
+    data = request.get_json(silent=True) or {}
+    fmt = data.get('format', 'csv')
+    if not format_available(fmt):
+        return jsonify(message='Unsupported format'), 400
+    try:
+        start = _parse_time(data.get('start'), 'start')
+        end = _parse_time(data.get('end'), 'end')
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+    # Celery (and kombu) load on the first export, not at startup
+    from kombu.exceptions import OperationalError
+    from app.tasks.background_tasks import export_consumption
+    export_id = uuid.uuid4().hex
+    export_dir = current_app.config['EXPORT_DIR']
+    set_export_status(export_dir, current_user.id, export_id, EXPORT_PENDING)
+    try:
+        export_consumption.delay(current_user.id, export_id, fmt,
+                                 start.isoformat() if start else None, end.isoformat() if end else None)
+    except OperationalError:
+        # the broker is unreachable; don't leave the export pending forever
+        set_export_status(export_dir, current_user.id, export_id, EXPORT_FAILED)
+        return jsonify(message='Exports are unavailable right now, please retry later'), 503
+    mongo_service.log_event('export_consumption_queued', {'user_id': current_user.id, 'export_id': export_id})
+    return jsonify(export_id=export_id, url=f'/consumption/export/{export_id}'), 202
+
+@consumption_bp.route('/export/<export_id>', methods=['GET'])
+@jwt_required()
+def get_export(export_id):
+    if not re.fullmatch(r'[0-9a-f]{32}', export_id):
+        return jsonify(message='Export not found'), 404
+    found = find_export(current_app.config['EXPORT_DIR'], current_user.id, export_id)
+    if found is None:
+        return jsonify(message='Export not found'), 404
+    status, path, fmt = found
+    if status == EXPORT_PENDING:
+        return jsonify(status=status), 202
+    if status == EXPORT_FAILED:
+        return jsonify(status=status, message='Export failed, please start a new one'), 500
+    return send_file(path, as_attachment=True, download_name=f'consumption.{fmt}')
+
+def _parse_time_arg(name):
+    return _parse_time(request.args.get(name), name)
+
+def _parse_time(value, name):
+    if not value:
+        return None
+    try:
+        return to_utc(datetime.fromisoformat(value))
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid {name}')
@@ -0,0 +1,23 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, current_user
+from app.services.aggregation_service import window_days
+from app.services.cache_service import response_cache
+from app.services.dashboard_service import get_dashboard, parse_fields
+from app.services.mongo_service import mongo_service
+from app.services.timezone_service import local_today
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+@dashboard_bp.route('', methods=['GET'])
+@jwt_required()
+def dashboard():
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify(message=str(e)), 400
+    days = window_days(request.args.get('days', type=int))
+    mongo_service.log_event('get_dashboard_request', {'user_id': current_user.id, 'fields': ','.join(fields)})
+    today = local_today(current_user.timezone)
+    return response_cache.respond('dashboard', current_user.id,
+                                  lambda: get_dashboard(current_user, fields, days, today),
+                                  variant=f"{','.join(fields)}:{days}", day=today)
@@ -0,0 +1,14 @@
+from flask import Blueprint, jsonify
+from app.extensions import db
+from app.services.mongo_service import mongo_service
+from app.services.pool_service import pool_stats
+
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('', methods=['GET'])
+def health():
+    return jsonify(
+        status='ok',
+        database=pool_stats(db.engine),
+        events=dict(mongo_service.stats(), mongo=mongo_service.health())
+    ), 200
@@ -0,0 +1,8 @@
+from flask import Blueprint, current_app
+from app.services.metrics_service import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('', methods=['GET'])
+def prometheus_metrics():
+    return current_app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
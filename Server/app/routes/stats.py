@@ -1,32 +1,51 @@
-from flask import Blueprint, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import date
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, current_user
 from app.services.stats_service import get_today_stats, get_weekly_stats
-from app.models.user import User
-from app import db
+from app.services.analytics_service import get_user_analytics
+from app.services.aggregation_service import window_days
+from app.services.report_service import get_weekly_report
 from app.services.mongo_service import mongo_service
+from app.services.cache_service import response_cache
+from app.services.timezone_service import local_today
 
 stats_bp = Blueprint('stats', __name__)
 
 @stats_bp.route('/today', methods=['GET'])
 @jwt_required()
 def today_stats():
-    email = get_jwt_identity()
-    mongo_service.log_event('get_today_stats_request', {'user_email': email})
-    user = User.query.filter_by(email=email).first()
-    if not user:
-        mongo_service.log_event('get_today_stats_failure', {'user_email': email, 'reason': 'user_not_found'})
-        return jsonify(message='User not found'), 404
-    stats = get_today_stats(user)
-    return jsonify(stats), 200
+    mongo_service.log_event('get_today_stats_request', {'user_id': current_user.id})
+    return response_cache.respond('stats_today', current_user.id, lambda: get_today_stats(current_user),
+                                  day=local_today(current_user.timezone))
 
 @stats_bp.route('/weekly', methods=['GET'])
 @jwt_required()
 def weekly_stats():
-    email = get_jwt_identity()
-    mongo_service.log_event('get_weekly_stats_request', {'user_email': email})
-    user = User.query.filter_by(email=email).first()
-    if not user:
-        mongo_service.log_event('get_weekly_stats_failure', {'user_email': email, 'reason': 'user_not_found'})
-        return jsonify(message='User not found'), 404
-    stats = get_weekly_stats(user)
-    return jsonify(stats), 200
+    mongo_service.log_event('get_weekly_stats_request', {'user_id': current_user.id})
+    days = window_days(request.args.get('days', type=int))
+    return response_cache.respond('stats_weekly', current_user.id,
+                                  lambda: get_weekly_stats(current_user, days), variant=days,
+                                  day=local_today(current_user.timezone))
+
+@stats_bp.route('/analytics', methods=['GET'])
+@jwt_required()
+def analytics():
+    mongo_service.log_event('get_analytics_request', {'user_id': current_user.id})
+    today = local_today(current_user.timezone)
+    return response_cache.respond('stats_analytics', current_user.id,
+                                  lambda: get_user_analytics(current_user, today), day=today)
+
+@stats_bp.route('/reports/weekly', methods=['GET'])
+@jwt_required()
+def weekly_report():
+    mongo_service.log_event('get_weekly_report_request', {'user_id': current_user.id})
+    week_start = request.args.get('week_start')
+    if week_start:
+        try:
+            week_start = date.fromisoformat(week_start)
+        except ValueError:
+            return jsonify(message='Invalid week_start'), 400
+    report = get_weekly_report(current_user.id, week_start)
+    if report is None:
+        return jsonify(message='No weekly report yet'), 404
+    return jsonify(report.to_dict()), 200
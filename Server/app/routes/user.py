@@ -1,34 +1,69 @@
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required, current_user
+from sqlalchemy.exc import IntegrityError
 from app.models.user import User
 from app.extensions import db
 from app.services.mongo_service import mongo_service
+from app.services.user_cache import user_cache
+from app.services.cache_service import response_cache
+from app.services.rollup_service import rebuild_rollups
+from app.services.timezone_service import get_zone
+from app.services.token_service import issue_tokens, revocation_list
 
 user_bp = Blueprint('user', __name__)
 
 @user_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
-    email = get_jwt_identity()
-    mongo_service.log_event('get_profile_request', {'user_email': email})
-    user = User.query.filter_by(email=email).first()
-    if not user:
-        mongo_service.log_event('get_profile_failure', {'user_email': email, 'reason': 'user_not_found'})
-        return jsonify(message='User not found'), 404
+    mongo_service.log_event('get_profile_request', {'user_id': current_user.id})
     return jsonify(
-        email=user.email,
-        created_at=user.created_at.isoformat()
+        email=current_user.email,
+        created_at=current_user.created_at,
+        timezone=current_user.timezone
     ), 200
 
 @user_bp.route('/profile', methods=['PUT'])
 @jwt_required()
 def update_profile():
-    current_user_email = get_jwt_identity()
-    user = User.query.filter_by(email=current_user_email).first_or_404()
-    data = request.get_json()
+    user = db.session.get(User, current_user.id)
+    if user is None:
+        return jsonify(message='User not found'), 404
+    previous_email = user.email
+    previous_timezone = user.timezone
+    data = request.get_json(silent=True) or {}
+    if 'timezone' in data:
+        try:
+            get_zone(data['timezone'])
+        except ValueError as e:
+            return jsonify(message=str(e)), 400
+        user.timezone = data['timezone']
     if 'username' in data:
         user.username = data['username']
     if 'email' in data:
         user.email = data['email']
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify(message='User with this email or username already exists'), 409
+    if user.timezone != previous_timezone:
+        # rollup days follow the user's calendar, so re-bucket their history
+        _rebuild_rollups_later(user.id)
+    if user.email != previous_email or user.timezone != previous_timezone:
+        # cached responses such as /dashboard embed the profile
+        response_cache.invalidate_user(user.id)
+        user_cache.invalidate(str(user.id), previous_email, user.email)
+        # access tokens carry the email and timezone: retire the old ones and hand out fresh ones
+        revocation_list.revoke_user_tokens(user.id, current_app.config['JWT_REFRESH_TOKEN_EXPIRES'])
+        return jsonify(message='Profile updated successfully', **issue_tokens(user)), 200
     return jsonify(message='Profile updated successfully'), 200
+
+def _rebuild_rollups_later(user_id):
+    # a long history takes a while to re-bucket, so the worker does it
+    from kombu.exceptions import OperationalError
+    from app.tasks.background_tasks import rebuild_user_rollups
+    try:
+        rebuild_user_rollups.delay(user_id)
+    except OperationalError:
+        # without a broker, stats would keep the old buckets until the next rebuild
+        rebuild_rollups(user_id)
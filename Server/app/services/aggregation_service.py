@@ -0,0 +1,148 @@
+from datetime import datetime, date, timedelta
+from sqlalchemy import func
+from app.models.consumption import Consumption
+from app.models.daily_rollup import DailyConsumptionRollup
+from app.extensions import db
+from app.services.timezone_service import DEFAULT_TIMEZONE, local_today, utc_bounds
+
+MAX_WINDOW_DAYS = 366
+
+
+def local_timestamp(column, tz):
+    """
+    SQL expression shifting a naive UTC timestamp column to wall-clock time in `tz`,
+    a zone name or a column holding one (e.g. User.timezone).
+    """
+    if db.engine.dialect.name == 'postgresql':
+        return func.timezone(tz, func.timezone('UTC', column))
+    # registered on every SQLite connection by pool_service
+    return func.iquit_local_time(column, tz)
+
+
+def local_day(column, tz):
+    """SQL expression for the local calendar day of a naive UTC timestamp column."""
+    return func.date(local_timestamp(column, tz))
+
+
+def local_week_start(column, tz):
+    """SQL expression for the Monday starting the local week of a timestamp column."""
+    if db.engine.dialect.name == 'postgresql':
+        return func.date(func.date_trunc('week', local_timestamp(column, tz)))
+    return func.date(local_timestamp(column, tz), 'weekday 0', '-6 days')
+
+
+def as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def daily_totals(user_id, days=7, until=None, tz_name=DEFAULT_TIMEZONE):
+    """
+    Returns count, quantity and cost per day for the `days` days ending on `until`
+    (the user's today by default), oldest first. Reads the daily rollup, which is
+    keyed by the user's local day, with a single grouped query; days without
+    entries are filled with zeros.
+    """
+    until = until or local_today(tz_name)
+    start_date = until - timedelta(days=days - 1)
+    rows = db.session.query(
+        DailyConsumptionRollup.day,
+        func.sum(DailyConsumptionRollup.count),
+        func.sum(DailyConsumptionRollup.quantity_sum),
+        func.sum(DailyConsumptionRollup.cost_sum)
+    ).filter(
+        DailyConsumptionRollup.user_id == user_id,
+        DailyConsumptionRollup.day >= start_date,
+        DailyConsumptionRollup.day <= until
+    ).group_by(DailyConsumptionRollup.day).all()
+    return _fill_days(rows, start_date, days)
+
+
+def raw_daily_totals(user_id, days=7, until=None, tz_name=DEFAULT_TIMEZONE):
+    """
+    Same as daily_totals, but grouped straight from the raw Consumption rows. The
+    database shifts each timestamp to `tz_name` and truncates it to the day; the
+    range filter stays on the raw column so the (user_id, timestamp) index is used.
+    """
+    until = until or local_today(tz_name)
+    start_date = until - timedelta(days=days - 1)
+    start, end = utc_bounds(start_date, until, tz_name)
+    bucket = local_day(Consumption.timestamp, tz_name).label('day')
+    rows = db.session.query(
+        bucket,
+        func.count(Consumption.id),
+        func.coalesce(func.sum(Consumption.quantity), 0.0),
+        func.coalesce(func.sum(Consumption.cost), 0.0)
+    ).filter(
+        Consumption.user_id == user_id,
+        Consumption.timestamp >= start,
+        Consumption.timestamp < end
+    ).group_by(bucket).all()
+    return _fill_days(rows, start_date, days)
+
+
+def raw_weekly_totals(user_id, weeks=4, until=None, tz_name=DEFAULT_TIMEZONE):
+    """
+    Count, quantity and cost per local week (Monday first) for the `weeks` weeks
+    ending with the one containing `until`, oldest first, bucketed in the database.
+    """
+    until = until or local_today(tz_name)
+    first_week = until - timedelta(days=until.weekday() + 7 * (weeks - 1))
+    start, end = utc_bounds(first_week, until, tz_name)
+    bucket = local_week_start(Consumption.timestamp, tz_name).label('week')
+    rows = db.session.query(
+        bucket,
+        func.count(Consumption.id),
+        func.coalesce(func.sum(Consumption.quantity), 0.0),
+        func.coalesce(func.sum(Consumption.cost), 0.0)
+    ).filter(
+        Consumption.user_id == user_id,
+        Consumption.timestamp >= start,
+        Consumption.timestamp < end
+    ).group_by(bucket).all()
+    by_week = {as_date(row[0]): row for row in rows}
+    totals = []
+    for i in range(weeks):
+        week = first_week + timedelta(weeks=i)
+        row = by_week.get(week)
+        totals.append({
+            'week_start': week,
+            'count': int(row[1]) if row else 0,
+            'quantity': float(row[2]) if row else 0.0,
+            'cost': float(row[3]) if row else 0.0,
+        })
+    return totals
+
+
+def _fill_days(rows, start_date, days):
+    by_day = {as_date(row[0]): row for row in rows}
+    totals = []
+    for i in range(days):
+        day = start_date + timedelta(days=i)
+        row = by_day.get(day)
+        totals.append({
+            'date': day,
+            'count': int(row[1]) if row else 0,
+            'quantity': float(row[2]) if row else 0.0,
+            'cost': float(row[3]) if row else 0.0,
+        })
+    return totals
+
+
+def daily_counts(user_id, days=7, until=None, tz_name=DEFAULT_TIMEZONE):
+    """
+    Returns [{'date', 'count'}] for the `days` days ending on `until`, oldest first.
+    """
+    return [{'date': d['date'], 'count': d['count']} for d in daily_totals(user_id, days, until, tz_name)]
+
+
+def window_days(value, default=7):
+    """
+    Clamps a requested window length (e.g. a ?days= argument) to 1..MAX_WINDOW_DAYS.
+    """
+    if value is None:
+        return default
+    return max(1, min(value, MAX_WINDOW_DAYS))
@@ -0,0 +1,151 @@
+from datetime import timedelta
+import numpy as np
+from sqlalchemy import func
+from app.models.user import User
+from app.models.daily_rollup import DailyConsumptionRollup
+from app.extensions import db
+from app.services.aggregation_service import as_date
+from app.services.timezone_service import local_date, local_today
+
+# days of history loaded per user; streaks longer than this are reported as this long
+MAX_HISTORY_DAYS = 365
+# the first days of tracking define the user's baseline for money saved
+BASELINE_DAYS = 7
+TREND_DAYS = 30
+
+
+def get_user_analytics(user, until=None):
+    """
+    Streaks, rolling averages, trend and money saved for one user, as of `until`
+    (the user's today by default). `user` needs id, created_at and timezone.
+    """
+    until = until or local_today(user.timezone)
+    created = {user.id: local_date(user.created_at, user.timezone)} if user.created_at else {}
+    return bulk_analytics([user.id], until, created)[user.id]
+
+
+def bulk_analytics(user_ids, until, created_days=None):
+    """
+    Returns {user_id: metrics} for many users at once. Every user's per-day series
+    is loaded with one grouped query over the daily rollup and all metrics are
+    computed on a (users x days) array in one vectorized pass.
+    created_days: optional {user_id: local signup day}; a user's series starts on
+    the earlier of that day and their first logged day.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    first_day = until - timedelta(days=MAX_HISTORY_DAYS - 1)
+    counts, costs = _load_series(user_ids, first_day, until)
+    starts = _series_starts(user_ids, counts, first_day, created_days or {})
+    metrics = compute_metrics(counts, costs, starts)
+    return {
+        user_id: {name: _plain(values[row]) for name, values in metrics.items()}
+        for row, user_id in enumerate(user_ids)
+    }
+
+
+def _load_series(user_ids, first_day, until):
+    days = (until - first_day).days + 1
+    rows = db.session.query(
+        DailyConsumptionRollup.user_id,
+        DailyConsumptionRollup.day,
+        func.sum(DailyConsumptionRollup.count),
+        func.sum(DailyConsumptionRollup.cost_sum)
+    ).filter(
+        DailyConsumptionRollup.user_id.in_(user_ids),
+        DailyConsumptionRollup.day >= first_day,
+        DailyConsumptionRollup.day <= until
+    ).group_by(DailyConsumptionRollup.user_id, DailyConsumptionRollup.day).all()
+    counts = np.zeros((len(user_ids), days))
+    costs = np.zeros((len(user_ids), days))
+    if rows:
+        index = {user_id: row for row, user_id in enumerate(user_ids)}
+        user_col, day_col, count_col, cost_col = zip(*rows)
+        r = np.fromiter((index[u] for u in user_col), dtype=np.int64, count=len(rows))
+        c = np.fromiter(((as_date(d) - first_day).days for d in day_col), dtype=np.int64, count=len(rows))
+        counts[r, c] = np.asarray(count_col, dtype=float)
+        costs[r, c] = np.asarray(cost_col, dtype=float)
+    return counts, costs
+
+
+def _series_starts(user_ids, counts, first_day, created_days):
+    days = counts.shape[1]
+    logged = counts > 0
+    first_logged = np.where(logged.any(axis=1), logged.argmax(axis=1), days - 1)
+    created = np.fromiter(
+        ((created_days[u] - first_day).days if u in created_days else days - 1 for u in user_ids),
+        dtype=np.int64, count=len(user_ids)
+    )
+    return np.clip(np.minimum(first_logged, created), 0, days - 1)
+
+
+def compute_metrics(counts, costs, starts):
+    """
+    counts, costs: (users x days) arrays of daily totals, oldest day first, ending today.
+    starts: per user, the column where their tracking begins.
+    Returns {metric: array of one value per user}.
+    """
+    users, days = counts.shape
+    columns = np.arange(days)
+    active = columns >= starts[:, None]
+    active_days = days - starts
+
+    # abstinence streaks: length of the zero run ending at each day, reset by any use
+    clean = (counts == 0) & active
+    run = np.cumsum(clean, axis=1)
+    last_reset = np.maximum.accumulate(np.where(clean, 0, run), axis=1)
+    streak = run - last_reset
+    current_streak = streak[:, -1]
+    longest_streak = streak.max(axis=1)
+
+    totals = np.cumsum(counts, axis=1)
+    rolling_7 = _window_sum(totals, 7) / np.minimum(active_days, 7)
+    rolling_30 = _window_sum(totals, 30) / np.minimum(active_days, 30)
+
+    # least-squares slope of daily counts over the trend window (per day, negative is improving)
+    weights = active[:, -TREND_DAYS:].astype(float)
+    x = columns[-TREND_DAYS:].astype(float)
+    y = counts[:, -TREND_DAYS:]
+    n = weights.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = (weights * x).sum(axis=1) / n
+        y_mean = (weights * y).sum(axis=1) / n
+        dx = (x - x_mean[:, None]) * weights
+        trend_slope = np.nan_to_num((dx * (y - y_mean[:, None])).sum(axis=1) / (dx * dx).sum(axis=1))
+
+    # money saved: baseline daily spend (first BASELINE_DAYS of tracking) vs. actual spend since
+    spent = np.concatenate([np.zeros((users, 1)), np.cumsum(costs, axis=1)], axis=1)
+    rows = np.arange(users)
+    baseline_end = np.minimum(starts + BASELINE_DAYS, days)
+    baseline_cost_per_day = (spent[rows, baseline_end] - spent[rows, starts]) / BASELINE_DAYS
+    since_baseline = days - baseline_end
+    money_saved = baseline_cost_per_day * since_baseline - (spent[rows, days] - spent[rows, baseline_end])
+    money_saved = np.where(active_days > BASELINE_DAYS, money_saved, 0.0)
+
+    return {
+        'current_streak': current_streak,
+        'longest_streak': longest_streak,
+        'rolling_7': rolling_7,
+        'rolling_30': rolling_30,
+        'trend_slope': trend_slope,
+        'baseline_cost_per_day': baseline_cost_per_day,
+        'money_saved': money_saved,
+    }
+
+
+def _window_sum(totals, window):
+    before = totals[:, -window - 1] if totals.shape[1] > window else 0.0
+    return totals[:, -1] - before
+
+
+def _plain(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    return round(float(value), 4)
+
+
+def load_created_days(user_ids):
+    """{user_id: local signup day} for the given users, one query."""
+    rows = db.session.query(User.id, User.created_at, User.timezone).filter(User.id.in_(user_ids)).all()
+    return {user_id: local_date(created_at, tz) for user_id, created_at, tz in rows if created_at}
@@ -1,31 +1,62 @@
 from app.models.user import User
 from app.extensions import db
-from flask_jwt_extended import create_access_token
+from app.services.password_service import PasswordHasherBusy
+from app.services.token_service import DEBUG_EMAIL, issue_tokens
 from flask import current_app
 
 
+def is_debug_login(email):
+    return bool(current_app.config.get('DEBUG_FAKE_DATA')) and email == DEBUG_EMAIL
+
+
+def debug_user():
+    """
+    The shared debug account used when DEBUG_FAKE_DATA is on. Tokens identify users by
+    id, so the account is created on first use; it has no password.
+    """
+    user = User.query.filter_by(email=DEBUG_EMAIL).first()
+    if user is None:
+        user = User(email=DEBUG_EMAIL, username='debug')
+        db.session.add(user)
+        db.session.commit()
+    return user
+
+
+def upgrade_password_hash(user, password):
+    """
+    Rehashes a just-verified password when the hashing parameters changed since
+    `user`'s hash was made. The login already succeeded, so if the rehash fails
+    the old hash is kept.
+    """
+    if not user.password_needs_rehash():
+        return
+    try:
+        user.set_password(password)
+    except (ValueError, PasswordHasherBusy) as e:
+        current_app.logger.warning(f'Keeping the old password hash of user {user.id}: {e!r}')
+        return
+    db.session.commit()
+
+
 def signup_user(email, password):
     # Fake debug mode shortcut
-    if current_app.config.get('DEBUG_FAKE_DATA') and email == 'debug@iquit.dev':
-        token = create_access_token(identity=email)
-        return token, 200
+    if is_debug_login(email):
+        return issue_tokens(debug_user()), 200
     if User.query.filter_by(email=email).first():
         return None, 409
     user = User(email=email)
     user.set_password(password)
     db.session.add(user)
     db.session.commit()
-    token = create_access_token(identity=email)
-    return token, 201
+    return issue_tokens(user), 201
 
 
 def login_user(email, password):
     # Fake debug mode shortcut
-    if current_app.config.get('DEBUG_FAKE_DATA') and email == 'debug@iquit.dev':
-        token = create_access_token(identity=email)
-        return token, 200
+    if is_debug_login(email):
+        return issue_tokens(debug_user()), 200
     user = User.query.filter_by(email=email).first()
     if not user or not user.check_password(password):
         return None, 401
-    token = create_access_token(identity=email)
-    return token, 200
+    upgrade_password_hash(user, password)
+    return issue_tokens(user), 200
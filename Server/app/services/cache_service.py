@@ -0,0 +1,145 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.services import json_service
+
+_PENDING_KEY = 'response_cache_users'
+
+
+class NullBackend:
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+
+class MemoryBackend:
+    """
+    In-process LRU. Invalidation only reaches the worker that committed the write,
+    so use it for single-process deployments (run_dev.py) or with a short TTL.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class RedisBackend:
+    """
+    Shared across workers. Redis errors degrade to cache misses rather than failing requests.
+    """
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.errors = redis.RedisError
+
+    def get(self, key):
+        try:
+            return self.client.get(key)
+        except self.errors as e:
+            current_app.logger.warning(f"Response cache read failed: {e}")
+            return None
+
+    def set(self, key, value, ttl):
+        try:
+            self.client.set(key, value, ex=max(int(ttl), 1))
+        except self.errors as e:
+            current_app.logger.warning(f"Response cache write failed: {e}")
+
+
+class ResponseCache:
+    """
+    Read-through cache for per-user JSON responses, keyed by user, endpoint and day.
+    Writes that touch a user's consumption bump that user's generation when their
+    transaction commits, which retires every cached response for the user at once.
+    Responses carry an ETag so unchanged payloads are answered with 304.
+    """
+
+    def __init__(self):
+        self.backend = NullBackend()
+        self.ttl = 300
+
+    def init_app(self, app):
+        kind = app.config.get('CACHE_BACKEND', 'none')
+        self.ttl = app.config.get('CACHE_TTL', 300)
+        if kind == 'redis':
+            self.backend = RedisBackend(app.config['CACHE_REDIS_URL'])
+        elif kind == 'memory':
+            self.backend = MemoryBackend(app.config.get('CACHE_MAX_ENTRIES', 10000))
+        else:
+            self.backend = NullBackend()
+
+    def respond(self, name, user_id, compute, variant='', day=None):
+        """
+        Returns a JSON response for `compute()`, served from the cache when possible.
+        `day` is the user's current day (server date by default); entries expire with it.
+        """
+        day = day or date.today()
+        key = f'resp:{name}:{user_id}:{day.isoformat()}:{variant}:{self._generation(user_id)}'
+        cached = self.backend.get(key)
+        if cached is None:
+            body = json_service.dumps(compute())
+            etag = hashlib.sha1(body).hexdigest()
+            self.backend.set(key, etag.encode('ascii') + b'\n' + body, self.ttl)
+        else:
+            etag, body = cached.split(b'\n', 1)
+            etag = etag.decode('ascii')
+        response = current_app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        return response.make_conditional(request)
+
+    def invalidate_user(self, user_id):
+        # generations outlive the entries they guard, so an expired generation never
+        # resurrects an entry cached under an earlier one
+        self.backend.set(f'gen:{user_id}', str(time.time_ns()).encode('ascii'), self.ttl * 2)
+
+    def invalidate_on_commit(self, session, user_ids):
+        """
+        Schedules invalidation of `user_ids` for when `session` commits.
+        """
+        session.info.setdefault(_PENDING_KEY, set()).update(user_ids)
+
+    def _generation(self, user_id):
+        generation = self.backend.get(f'gen:{user_id}')
+        return generation.decode('ascii') if generation else '0'
+
+
+response_cache = ResponseCache()
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        response_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_users(session):
+    session.info.pop(_PENDING_KEY, None)
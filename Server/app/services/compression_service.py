@@ -0,0 +1,102 @@
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# preferred first when the client rates them equally
+ENCODINGS = ('br', 'gzip')
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html')
+
+
+class _GzipStream:
+    def __init__(self, level):
+        # wbits 31: zlib stream with a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def available_encodings():
+    return tuple(encoding for encoding in ENCODINGS if encoding != 'br' or brotli is not None)
+
+
+def compressor(encoding, gzip_level=6, brotli_quality=4):
+    return _BrotliStream(brotli_quality) if encoding == 'br' else _GzipStream(gzip_level)
+
+
+def compress(body, encoding, gzip_level=6, brotli_quality=4):
+    stream = compressor(encoding, gzip_level, brotli_quality)
+    return stream.compress(body) + stream.finish()
+
+
+def _compress_chunks(chunks, stream):
+    # the compressor buffers internally, so small chunks (one history row each)
+    # still compress as one stream and output leaves in blocks
+    try:
+        for chunk in chunks:
+            data = stream.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield stream.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def init_app(app):
+    """
+    Compresses JSON, NDJSON and CSV responses with brotli (when the brotli package
+    is installed) or gzip, as negotiated on Accept-Encoding. Buffered bodies below
+    COMPRESSION_MIN_SIZE go out as they are; streamed bodies (history, exports)
+    are compressed on the fly. File downloads are left alone. Register after
+    metrics_service so recorded sizes are the compressed ones.
+    """
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+    gzip_level = app.config.get('COMPRESSION_GZIP_LEVEL', 6)
+    brotli_quality = app.config.get('COMPRESSION_BROTLI_QUALITY', 4)
+    encodings = available_encodings()
+
+    @app.after_request
+    def _compress_response(response):
+        if (response.direct_passthrough or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or response.status_code in (204, 206, 304) or 'Content-Encoding' in response.headers):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(encodings)
+        if encoding is None:
+            return response
+        if response.is_streamed:
+            response.response = _compress_chunks(response.response,
+                                                 compressor(encoding, gzip_level, brotli_quality))
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < min_size:
+                return response
+            response.set_data(compress(body, encoding, gzip_level, brotli_quality))
+        response.content_encoding = encoding
+        # the encoded body differs byte for byte; If-None-Match still matches weakly
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
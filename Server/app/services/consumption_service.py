@@ -1,38 +1,210 @@
-from datetime import datetime, date, timedelta
-from app.models.consumption import Consumption
-from sqlalchemy import func
+import base64
+import math
+from datetime import datetime
+from sqlalchemy import Boolean, and_, literal, or_
+from sqlalchemy.exc import IntegrityError
+from app.models.consumption import Consumption, ConsumptionArchive, ConsumptionIdempotencyKey
 from app.extensions import db
+from app.services.aggregation_service import daily_counts
+from app.services.rollup_service import record_rows
+from app.services.timezone_service import local_today, to_utc, utc_bounds
 
 
-def log_consumption(user, payload):
+MAX_IDEMPOTENCY_KEY_LENGTH = 64
+# text fields of an entry and their column lengths
+TEXT_FIELDS = {name: Consumption.__table__.c[name].type.length for name in ('substance_type', 'unit', 'notes')}
+# inserts of a batch that keeps colliding with concurrent replays before giving up
+BATCH_INSERT_ATTEMPTS = 3
+
+# columns needed to render an entry; query these instead of full ORM objects
+CONSUMPTION_COLUMNS = (
+    Consumption.id,
+    Consumption.timestamp,
+    Consumption.substance_type,
+    Consumption.quantity,
+    Consumption.unit,
+    Consumption.cost,
+    Consumption.notes,
+    Consumption.is_debug,
+)
+# the same columns read from archived months (which never hold debug rows)
+ARCHIVE_COLUMNS = (
+    ConsumptionArchive.id,
+    ConsumptionArchive.timestamp,
+    ConsumptionArchive.substance_type,
+    ConsumptionArchive.quantity,
+    ConsumptionArchive.unit,
+    ConsumptionArchive.cost,
+    ConsumptionArchive.notes,
+    literal(False, Boolean).label('is_debug'),
+)
+
+
+def serialize_consumption(row):
     """
-    Logs a consumption record for the given user.
-    payload: dict with keys substance_type, quantity, unit, cost, notes, timestamp (optional)
+    Renders a Consumption entry, or a row of CONSUMPTION_COLUMNS, as a dict for
+    json_service (which writes the timestamp as ISO 8601).
+    """
+    return {
+        'id': row.id,
+        'timestamp': row.timestamp,
+        'substance_type': row.substance_type,
+        'quantity': row.quantity,
+        'unit': row.unit,
+        'cost': row.cost,
+        'notes': row.notes,
+        'is_debug': row.is_debug
+    }
+
+
+def parse_consumption(payload):
+    """
+    Validates a consumption payload and returns the column values for a new entry.
+    Raises ValueError with a client-facing message when the payload is invalid.
     """
+    if not isinstance(payload, dict):
+        raise ValueError('Invalid entry')
+    substance = payload.get('substance_type')
+    quantity = payload.get('quantity')
+    unit = payload.get('unit')
+    if not substance or quantity is None or not unit:
+        raise ValueError('Missing fields')
+    for name, length in TEXT_FIELDS.items():
+        value = payload.get(name)
+        if value is not None and (not isinstance(value, str) or len(value) > length):
+            raise ValueError(f'{name} must be a string of at most {length} characters')
+    cost = payload.get('cost', 0.0)
+    if not _is_number(quantity):
+        raise ValueError('quantity must be a number')
+    if cost is not None and not _is_number(cost):
+        raise ValueError('cost must be a number')
     ts = payload.get('timestamp')
     if ts:
-        ts = datetime.fromisoformat(ts)
+        try:
+            # stored as naive UTC; offsets in the payload are honoured
+            ts = to_utc(datetime.fromisoformat(ts))
+        except (TypeError, ValueError):
+            raise ValueError('Invalid timestamp')
     else:
         ts = datetime.utcnow()
-    entry = Consumption(
-        user_id=user.id,
-        timestamp=ts,
-        substance_type=payload['substance_type'],
-        quantity=payload['quantity'],
-        unit=payload['unit'],
-        cost=payload.get('cost', 0.0),
-        notes=payload.get('notes'),
-        is_debug=(user.email == 'debug@iquit.dev')
-    )
-    db.session.add(entry)
+    return {
+        'timestamp': ts,
+        'substance_type': substance,
+        'quantity': quantity,
+        'unit': unit,
+        'cost': cost,
+        'notes': payload.get('notes'),
+    }
+
+
+def _is_number(value):
+    # bool is an int subclass; NaN and infinity are accepted by the JSON parser
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def log_consumption(user, payload):
+    """
+    Logs a consumption record for the given user and returns its id.
+    payload: dict with keys substance_type, quantity, unit, cost, notes, timestamp (optional)
+    Raises ValueError if the payload is invalid.
+    """
+    return insert_consumption(user, parse_consumption(payload), is_debug=(user.email == 'debug@iquit.dev'))
+
+
+def insert_consumption(user, values, is_debug=False):
+    """
+    Stores one parsed entry (see parse_consumption) and its rollup update, and
+    returns the new id. A single Core INSERT (RETURNING id on Postgres) with no ORM
+    object to build, flush or reload after commit.
+    """
+    row = dict(values, user_id=user.id, is_debug=bool(is_debug))
+    result = db.session.execute(Consumption.__table__.insert().values(**row))
+    record_rows([row], user.timezone)
     db.session.commit()
-    return entry
+    return result.inserted_primary_key[0]
+
+
+def log_consumption_batch(user, payloads, is_debug=False):
+    """
+    Logs many consumption records for the given user in one transaction.
+    Every payload carries a client-generated `idempotency_key`; keys that were already
+    stored for this user (or repeated within the batch) are reported as duplicates
+    instead of being inserted again, including keys of archived rows.
+    Returns one result dict per payload, in order: {'index', 'idempotency_key', 'status', ...}
+    where status is 'created', 'duplicate' or 'invalid'. Raises IntegrityError when
+    concurrent replays of the same keys still collide after BATCH_INSERT_ATTEMPTS
+    tries; nothing is stored then, and the client can safely resend the batch.
+    """
+    results = [None] * len(payloads)
+    pending = {}
+    for index, payload in enumerate(payloads):
+        key = payload.get('idempotency_key') if isinstance(payload, dict) else None
+        result = {'index': index, 'idempotency_key': key}
+        results[index] = result
+        if not isinstance(key, str) or not key or len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            result.update(status='invalid', message='Missing or invalid idempotency_key')
+            continue
+        try:
+            values = parse_consumption(payload)
+        except ValueError as e:
+            result.update(status='invalid', message=str(e))
+            continue
+        pending.setdefault(key, (index, values))
+    if pending:
+        for attempt in range(1, BATCH_INSERT_ATTEMPTS + 1):
+            try:
+                created = _insert_batch(user, pending, is_debug)
+                break
+            except IntegrityError:
+                # a concurrent replay stored some of these keys first; the next attempt sees them
+                db.session.rollback()
+                if attempt == BATCH_INSERT_ATTEMPTS:
+                    raise
+        ids = _ids_for_keys(user.id, list(pending))
+        for result in results:
+            key = result['idempotency_key']
+            if 'status' in result or key not in ids:
+                continue
+            first = key in created and pending[key][0] == result['index']
+            result.update(status='created' if first else 'duplicate', id=ids[key])
+    return results
+
+
+def _insert_batch(user, pending, is_debug):
+    existing = set(_ids_for_keys(user.id, list(pending)))
+    rows = [
+        dict(values, user_id=user.id, is_debug=is_debug, idempotency_key=key)
+        for key, (index, values) in pending.items()
+        if key not in existing
+    ]
+    if rows:
+        db.session.execute(Consumption.__table__.insert(), rows)
+        created = db.session.query(Consumption.idempotency_key, Consumption.id).filter(
+            Consumption.user_id == user.id,
+            Consumption.idempotency_key.in_([row['idempotency_key'] for row in rows])
+        )
+        # raises IntegrityError when a concurrent replay committed one of these keys first
+        db.session.execute(ConsumptionIdempotencyKey.__table__.insert(), [
+            {'user_id': user.id, 'idempotency_key': key, 'consumption_id': consumption_id}
+            for key, consumption_id in created
+        ])
+        record_rows(rows, user.timezone)
+    db.session.commit()
+    return {row['idempotency_key'] for row in rows}
+
+
+def _ids_for_keys(user_id, keys):
+    stored = ConsumptionIdempotencyKey
+    rows = db.session.query(stored.idempotency_key, stored.consumption_id).filter(
+        stored.user_id == user_id,
+        stored.idempotency_key.in_(keys)
+    ).all()
+    return dict(rows)
 
 
 def get_today_consumptions(user):
-    today = date.today()
-    start = datetime.combine(today, datetime.min.time())
-    end = start + timedelta(days=1)
+    today = local_today(user.timezone)
+    start, end = utc_bounds(today, today, user.timezone)
     return Consumption.query.filter(
         Consumption.user_id == user.id,
         Consumption.timestamp >= start,
@@ -40,18 +212,80 @@ def get_today_consumptions(user):
     ).all()
 
 
-def get_weekly_summary(user):
-    today = date.today()
-    start_date = today - timedelta(days=6)
-    summary = []
-    for i in range(7):
-        day = start_date + timedelta(days=i)
-        day_start = datetime.combine(day, datetime.min.time())
-        day_end = day_start + timedelta(days=1)
-        count = db.session.query(func.count(Consumption.id)).filter(
-            Consumption.user_id == user.id,
-            Consumption.timestamp >= day_start,
-            Consumption.timestamp < day_end
-        ).scalar()
-        summary.append({'date': day.isoformat(), 'count': count})
-    return summary
+def day_entries(user_id, day, tz_name):
+    """
+    The user's entries on local `day`, serialized.
+    """
+    start, end = utc_bounds(day, day, tz_name)
+    rows = db.session.query(*CONSUMPTION_COLUMNS).filter(
+        Consumption.user_id == user_id,
+        Consumption.timestamp >= start,
+        Consumption.timestamp < end
+    )
+    return [serialize_consumption(row) for row in rows]
+
+
+def get_weekly_summary(user, days=7):
+    return daily_counts(user.id, days, tz_name=user.timezone)
+
+
+def iter_history(user_id, before=None, start=None, end=None, limit=None, chunk_size=500):
+    """
+    Yields rows of CONSUMPTION_COLUMNS for the user, newest first, ordered by (timestamp, id).
+    before: optional (timestamp, id) keyset position; only older rows are returned.
+    start/end: optional timestamp range [start, end).
+    Rows are fetched `chunk_size` at a time through a server-side cursor, so memory
+    stays flat however long the history is. Archived months are older than every
+    live row, so they are read once the live table is exhausted.
+    """
+    remaining = limit
+    for model, columns in ((Consumption, CONSUMPTION_COLUMNS), (ConsumptionArchive, ARCHIVE_COLUMNS)):
+        if remaining is not None and remaining <= 0:
+            return
+        query = history_query(model, columns, user_id, before, start, end)
+        query = query.order_by(model.timestamp.desc(), model.id.desc())
+        if remaining is not None:
+            query = query.limit(remaining)
+        for row in query.execution_options(stream_results=True).yield_per(chunk_size):
+            yield row
+            if remaining is not None:
+                remaining -= 1
+
+
+def history_query(model, columns, user_id, before=None, start=None, end=None):
+    """
+    `columns` of `model` (Consumption or ConsumptionArchive) for one user, filtered by
+    keyset position and time range. Every timestamp condition is a plain comparison on
+    the column, so the (user_id, timestamp) index and Postgres partition pruning apply.
+    """
+    query = db.session.query(*columns).filter(model.user_id == user_id)
+    if before is not None:
+        ts, entry_id = before
+        # the plain upper bound on timestamp keeps the (user_id, timestamp) index usable
+        query = query.filter(
+            model.timestamp <= ts,
+            or_(model.timestamp < ts, and_(model.timestamp == ts, model.id < entry_id))
+        )
+    if start is not None:
+        query = query.filter(model.timestamp >= start)
+    if end is not None:
+        query = query.filter(model.timestamp < end)
+    return query
+
+
+def encode_cursor(row):
+    raw = f'{row.timestamp.isoformat()}|{row.id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Returns the (timestamp, id) keyset position encoded by encode_cursor.
+    Raises ValueError for a malformed cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        ts, entry_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(ts), int(entry_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError('Invalid cursor') from e
@@ -0,0 +1,47 @@
+from app.services.aggregation_service import daily_totals
+from app.services.consumption_service import day_entries
+from app.services.timezone_service import local_today
+
+# sections of GET /dashboard, in response order
+DASHBOARD_FIELDS = ('profile', 'today', 'weekly', 'entries')
+
+
+def parse_fields(value):
+    """
+    Parses a comma separated `fields=` selector into a tuple in DASHBOARD_FIELDS
+    order; empty selects every section. Raises ValueError on unknown names.
+    """
+    if not value:
+        return DASHBOARD_FIELDS
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested.difference(DASHBOARD_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in DASHBOARD_FIELDS if name in requested)
+
+
+def get_dashboard(user, fields=DASHBOARD_FIELDS, days=7, today=None):
+    """
+    The home screen in one payload: the same sections as /user/profile, /stats/today,
+    /stats/weekly and /consumption/today. `today` and `weekly` share one rollup
+    query over the window, `entries` adds one query and `profile` needs none.
+    `user` needs id, email, created_at and timezone.
+    """
+    today = today or local_today(user.timezone)
+    dashboard = {'date': today}
+    if 'profile' in fields:
+        dashboard['profile'] = {
+            'email': user.email,
+            'created_at': user.created_at,
+            'timezone': user.timezone,
+        }
+    if 'today' in fields or 'weekly' in fields:
+        totals = daily_totals(user.id, days, today, user.timezone)
+        if 'today' in fields:
+            dashboard['today'] = {'count': totals[-1]['count'], 'total_cost': totals[-1]['cost']}
+        if 'weekly' in fields:
+            daily = [{'date': d['date'], 'count': d['count']} for d in totals]
+            dashboard['weekly'] = {'daily': daily, 'average': sum(d['count'] for d in daily) / days}
+    if 'entries' in fields:
+        dashboard['entries'] = day_entries(user.id, today, user.timezone)
+    return dashboard
@@ -0,0 +1,189 @@
+import csv
+import importlib.util
+import io
+import os
+import time
+from app.models.consumption import Consumption, ConsumptionArchive
+from app.services import json_service
+from app.services.consumption_service import ARCHIVE_COLUMNS, CONSUMPTION_COLUMNS, history_query, serialize_consumption
+
+# formats that can be produced row by row into a response
+STREAMING_FORMATS = ('csv', 'ndjson')
+# parquet only when the optional pyarrow package is installed
+EXPORT_FORMATS = STREAMING_FORMATS + (('parquet',) if importlib.util.find_spec('pyarrow') else ())
+EXPORT_FIELDS = tuple(column.key for column in CONSUMPTION_COLUMNS)
+# <export_id>.status next to the export: 'pending' until the file appears, or 'failed'
+EXPORT_PENDING = 'pending'
+EXPORT_FAILED = 'failed'
+
+
+def format_available(fmt):
+    return fmt in EXPORT_FORMATS
+
+
+def iter_export_rows(user_id, start=None, end=None, chunk_size=1000):
+    """
+    Yields rows of CONSUMPTION_COLUMNS for the user, oldest first (archived months
+    first), optionally within [start, end). Rows come through a server-side cursor
+    `chunk_size` at a time.
+    """
+    for model, columns in ((ConsumptionArchive, ARCHIVE_COLUMNS), (Consumption, CONSUMPTION_COLUMNS)):
+        query = history_query(model, columns, user_id, start=start, end=end).order_by(model.timestamp, model.id)
+        yield from query.execution_options(stream_results=True).yield_per(chunk_size)
+
+
+def iter_csv(rows, chunk_size=1000):
+    """
+    Renders rows as CSV text (header first), yielding one string per `chunk_size` rows.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(_csv_values(row))
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json_service.dumps(serialize_consumption(row)) + b'\n'
+
+
+def _csv_values(row):
+    entry = serialize_consumption(row)
+    entry['timestamp'] = entry['timestamp'].isoformat()
+    return [entry[field] for field in EXPORT_FIELDS]
+
+
+def write_export(user_id, path, fmt='csv', start=None, end=None, chunk_size=1000):
+    """
+    Writes the user's entries to `path` in `fmt` ('csv', 'ndjson' or 'parquet'),
+    one chunk at a time. The file appears under its final name only once complete.
+    Returns the number of rows written. Parquet needs the optional pyarrow package.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError('Unsupported format')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rows = iter_export_rows(user_id, start, end, chunk_size)
+    partial = path + '.part'
+    try:
+        if fmt == 'parquet':
+            written = _write_parquet(rows, partial, chunk_size)
+        else:
+            written = 0
+            with open(partial, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if fmt == 'csv':
+                    writer.writerow(EXPORT_FIELDS)
+                for row in rows:
+                    if fmt == 'csv':
+                        writer.writerow(_csv_values(row))
+                    else:
+                        f.write(json_service.dumps(serialize_consumption(row)).decode('utf-8') + '\n')
+                    written += 1
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return written
+
+
+def _write_parquet(rows, path, chunk_size):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError('Parquet export requires pyarrow')
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('timestamp', pa.timestamp('us')),
+        ('substance_type', pa.string()),
+        ('quantity', pa.float64()),
+        ('unit', pa.string()),
+        ('cost', pa.float64()),
+        ('notes', pa.string()),
+        ('is_debug', pa.bool_()),
+    ])
+    written = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunk_size:
+                writer.write_table(_parquet_table(pa, schema, batch))
+                written += len(batch)
+                batch = []
+        if batch or not written:
+            writer.write_table(_parquet_table(pa, schema, batch))
+            written += len(batch)
+    return written
+
+
+def _parquet_table(pa, schema, rows):
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.Table.from_arrays([pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                                schema=schema)
+
+
+def export_path(export_dir, user_id, export_id, fmt):
+    return os.path.join(export_dir, str(user_id), f'{export_id}.{fmt}')
+
+
+def _status_path(export_dir, user_id, export_id):
+    return os.path.join(export_dir, str(user_id), f'{export_id}.status')
+
+
+def set_export_status(export_dir, user_id, export_id, status):
+    """Records EXPORT_PENDING (when queued) or EXPORT_FAILED for an export."""
+    path = _status_path(export_dir, user_id, export_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='ascii') as f:
+        f.write(status)
+
+
+def find_export(export_dir, user_id, export_id):
+    """
+    Returns ('ready', path, fmt) for a finished export, ('pending', None, None) or
+    ('failed', None, None) for a queued one, or None when there is no such export
+    (never queued, or expired).
+    """
+    for fmt in EXPORT_FORMATS:
+        path = export_path(export_dir, user_id, export_id, fmt)
+        if os.path.exists(path):
+            return 'ready', path, fmt
+    try:
+        with open(_status_path(export_dir, user_id, export_id), encoding='ascii') as f:
+            status = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return (EXPORT_FAILED if status == EXPORT_FAILED else EXPORT_PENDING), None, None
+
+
+def expire_exports(export_dir, max_age_seconds, now=None):
+    """
+    Deletes exports, status files and leftover partial files older than
+    `max_age_seconds`, and user directories left empty. Returns the number of files deleted.
+    """
+    if not os.path.isdir(export_dir):
+        return 0
+    cutoff = (now or time.time()) - max_age_seconds
+    deleted = 0
+    for entry in os.scandir(export_dir):
+        if not entry.is_dir():
+            continue
+        for item in os.scandir(entry.path):
+            if item.is_file() and item.stat().st_mtime < cutoff:
+                try:
+                    os.remove(item.path)
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+        try:
+            os.rmdir(entry.path)
+        except OSError:
+            pass
+    return deleted
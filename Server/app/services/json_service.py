@@ -0,0 +1,101 @@
+import json
+from datetime import date, time
+from flask import current_app, has_app_context
+from flask.json import JSONDecoder as FlaskJSONDecoder, JSONEncoder as FlaskJSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 'auto' uses orjson when it is installed, 'json' always uses the stdlib encoder
+JSON_PROVIDERS = ('auto', 'orjson', 'json')
+
+
+class JSONEncoder(FlaskJSONEncoder):
+    """
+    The stdlib encoder, rendering dates, datetimes and times as ISO 8601 (Flask's
+    default is an HTTP date), so serializers can hand them over as they are.
+    """
+
+    def default(self, o):
+        if isinstance(o, (date, time)):
+            return o.isoformat()
+        return super().default(o)
+
+    @classmethod
+    def dumpb(cls, obj):
+        return json.dumps(obj, cls=cls, separators=(',', ':')).encode('utf-8')
+
+
+class OrjsonEncoder(JSONEncoder):
+    """
+    Encodes with orjson, which renders dates and datetimes exactly like isoformat().
+    Non-ASCII characters are written as UTF-8 whatever JSON_AS_ASCII says. Values
+    orjson rejects (integers beyond 64 bits) go through the stdlib encoder.
+    """
+
+    def encode(self, o):
+        option = _ORJSON_OPTIONS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.indent is not None:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(o, default=self.default, option=option).decode('utf-8')
+        except TypeError:
+            return super().encode(o)
+
+    @classmethod
+    def dumpb(cls, obj):
+        try:
+            return orjson.dumps(obj, default=_orjson_default, option=_ORJSON_OPTIONS)
+        except TypeError:
+            return super().dumpb(obj)
+
+
+class OrjsonDecoder(FlaskJSONDecoder):
+    """Parses request bodies with orjson. Its errors are ValueErrors, like the stdlib's."""
+
+    def decode(self, s, _w=None):
+        return orjson.loads(s)
+
+
+_orjson_default = OrjsonEncoder().default
+# analytics hands over numpy scalars
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY if orjson is not None else 0
+
+
+def encoder_class(provider):
+    if provider not in JSON_PROVIDERS:
+        raise ValueError(f"JSON_PROVIDER must be one of {', '.join(JSON_PROVIDERS)}")
+    if provider == 'orjson' and orjson is None:
+        raise ValueError('JSON_PROVIDER=orjson requires the orjson package')
+    return OrjsonEncoder if provider != 'json' and orjson is not None else JSONEncoder
+
+
+def init_app(app):
+    """
+    Installs the configured encoder and decoder, so jsonify, request.get_json()
+    and flask.json use it. dumps() below serves the streaming and cached paths.
+    """
+    app.json_encoder = encoder_class(app.config.get('JSON_PROVIDER', 'auto'))
+    if app.json_encoder is OrjsonEncoder:
+        app.json_decoder = OrjsonDecoder
+
+
+def _encoder():
+    encoder = current_app.json_encoder if has_app_context() else encoder_class('auto')
+    return encoder if hasattr(encoder, 'dumpb') else JSONEncoder
+
+
+def dumps(obj):
+    """
+    Compact JSON bytes for `obj` with the app's encoder (orjson when available).
+    Keys keep their insertion order.
+    """
+    return _encoder().dumpb(obj)
+
+
+def loads(s):
+    return orjson.loads(s) if _encoder() is OrjsonEncoder else json.loads(s)
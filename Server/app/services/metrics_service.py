@@ -0,0 +1,223 @@
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+SLOW_STATEMENTS_KEPT = 20
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Per-process request metrics rendered in the Prometheus text format.
+    Each gunicorn worker keeps its own registry; scrape every worker or aggregate
+    by instance.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collectors = []
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = {}
+            self.statements = {}
+            self.requests = {}
+            self.totals = {}
+
+    def add_collector(self, collector):
+        """
+        `collector()` returns [(name, type, help, value)] gauges/counters read at scrape time.
+        """
+        self._collectors.append(collector)
+
+    def observe_request(self, method, endpoint, status, seconds, sql_count, sql_seconds,
+                        mongo_seconds, response_bytes):
+        key = (method, endpoint)
+        with self._lock:
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.statements.setdefault(key, Histogram(STATEMENT_BUCKETS)).observe(sql_count)
+            status_key = key + (str(status),)
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            totals = self.totals.setdefault(key, {'sql_seconds': 0.0, 'mongo_seconds': 0.0, 'response_bytes': 0})
+            totals['sql_seconds'] += sql_seconds
+            totals['mongo_seconds'] += mongo_seconds
+            totals['response_bytes'] += response_bytes
+
+    def render(self):
+        lines = []
+        with self._lock:
+            self._render_histograms(lines, 'iquit_http_request_duration_seconds',
+                                    'Request latency in seconds.', self.latency)
+            self._render_histograms(lines, 'iquit_sql_statements_per_request',
+                                    'SQL statements issued per request.', self.statements)
+            lines.append('# HELP iquit_http_requests_total Requests handled.')
+            lines.append('# TYPE iquit_http_requests_total counter')
+            for (method, endpoint, status), value in sorted(self.requests.items()):
+                lines.append(f'iquit_http_requests_total{{{_labels(method, endpoint)},status="{status}"}} {value}')
+            for field, help_text in (('sql_seconds', 'Time spent executing SQL.'),
+                                     ('mongo_seconds', 'Time spent logging events to MongoDB.'),
+                                     ('response_bytes', 'Response body bytes sent.')):
+                name = f'iquit_http_{field}_total'
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for (method, endpoint), totals in sorted(self.totals.items()):
+                    lines.append(f'{name}{{{_labels(method, endpoint)}}} {totals[field]}')
+        for collector in self._collectors:
+            for name, kind, help_text, value in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histograms(lines, name, help_text, histograms):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (method, endpoint), histogram in sorted(histograms.items()):
+            labels = _labels(method, endpoint)
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+
+def _labels(method, endpoint):
+    return f'method="{method}",endpoint="{endpoint}"'
+
+
+metrics = MetricsRegistry()
+
+
+def record_mongo_time(seconds):
+    """
+    Called by the event logger so Mongo time is attributed to the current request.
+    """
+    if has_request_context() and 'perf' in g:
+        g.perf['mongo_seconds'] += seconds
+
+
+def init_app(app):
+    """
+    Registers the request hooks and SQL listeners. Requests record latency,
+    SQL statement count and time, Mongo event-log time and response size; requests
+    slower than SLOW_REQUEST_MS are logged with the statements they ran.
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    slow_seconds = app.config.get('SLOW_REQUEST_MS', 500) / 1000.0
+    _listen_for_sql()
+    if not metrics._collectors:
+        metrics.add_collector(_collect_runtime)
+
+    @app.before_request
+    def _start_request_timer():
+        g.perf = {
+            'started': time.perf_counter(),
+            'sql_count': 0,
+            'sql_seconds': 0.0,
+            'mongo_seconds': 0.0,
+            'statements': [],
+        }
+
+    @app.after_request
+    def _record_request(response):
+        perf = g.pop('perf', None)
+        if perf is None:
+            return response
+        elapsed = time.perf_counter() - perf['started']
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        size = 0 if response.is_streamed else (response.calculate_content_length() or 0)
+        metrics.observe_request(request.method, endpoint, response.status_code, elapsed,
+                                perf['sql_count'], perf['sql_seconds'], perf['mongo_seconds'], size)
+        if elapsed >= slow_seconds:
+            statements = '\n'.join(f'  {ms:.1f} ms  {sql}' for ms, sql in perf['statements'])
+            app.logger.warning(
+                f"Slow request {request.method} {request.path}: {elapsed * 1000:.1f} ms, "
+                f"{perf['sql_count']} SQL statements ({perf['sql_seconds'] * 1000:.1f} ms), "
+                f"mongo {perf['mongo_seconds'] * 1000:.1f} ms\n{statements}"
+            )
+        return response
+
+
+def _collect_runtime():
+    from app.extensions import db
+    from app.services.mongo_service import mongo_service
+    from app.services.pool_service import pool_stats
+    from app.services.user_cache import user_cache
+    from app.services.token_service import revocation_list
+    samples = []
+    pool = pool_stats(db.engine)
+    for field, kind, help_text in (
+        ('checked_out', 'gauge', 'Connections currently checked out.'),
+        ('overflow', 'gauge', 'Connections open beyond the pool size.'),
+        ('checkouts', 'counter', 'Connection checkouts.'),
+        ('timeouts', 'counter', 'Checkouts that timed out waiting for a connection.'),
+        ('wait_seconds_total', 'counter', 'Time spent waiting for connections.'),
+        ('wait_seconds_max', 'gauge', 'Longest wait for a connection.'),
+    ):
+        if field in pool:
+            suffix = '_total' if kind == 'counter' and not field.endswith('_total') else ''
+            samples.append((f'iquit_db_pool_{field}{suffix}', kind, help_text, pool[field]))
+    for field, value in mongo_service.stats().items():
+        kind = 'gauge' if field == 'pending' else 'counter'
+        suffix = '' if kind == 'gauge' else '_total'
+        samples.append((f'iquit_events_{field}{suffix}', kind, f'Event sink {field}.', value))
+    for field, value in user_cache.stats().items():
+        kind = 'gauge' if field == 'size' else 'counter'
+        suffix = '' if kind == 'gauge' else '_total'
+        samples.append((f'iquit_user_cache_{field}{suffix}', kind, f'current_user cache {field}.', value))
+    for field, value in revocation_list.stats().items():
+        kind = 'gauge' if field == 'size' else 'counter'
+        suffix = '' if kind == 'gauge' else '_total'
+        samples.append((f'iquit_token_revocation_cache_{field}{suffix}', kind,
+                        f'Token revocation front {field}.', value))
+    return samples
+
+
+_listening = False
+
+
+def _listen_for_sql():
+    global _listening
+    if _listening:
+        return
+    _listening = True
+
+    # the start time lives on the execution context, which is discarded with the
+    # statement, so a statement that raises leaves nothing behind on the pooled connection
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.query_started = time.perf_counter()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'query_started', None)
+        if started is None or not has_request_context() or 'perf' not in g:
+            return
+        elapsed = time.perf_counter() - started
+        perf = g.perf
+        perf['sql_count'] += 1
+        perf['sql_seconds'] += elapsed
+        if len(perf['statements']) < SLOW_STATEMENTS_KEPT:
+            perf['statements'].append((elapsed * 1000, ' '.join(statement.split())[:500]))
@@ -1,42 +1,350 @@
-import os
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
-from flask import current_app
-from datetime import datetime
+import atexit
+import queue
+import threading
+import time
+import re
+from datetime import datetime, timedelta
+from app.services.metrics_service import record_mongo_time
+
+_STOP = object()
+
+EVENT_COLLECTION = 'events'
+_MONTHLY_COLLECTION = re.compile(r'^events_(\d{4})_(\d{2})$')
+# $dateToString formats for summarize(); every window fits inside one monthly collection
+SUMMARY_WINDOWS = {'hour': '%Y-%m-%dT%H:00', 'day': '%Y-%m-%d', 'month': '%Y-%m'}
+LOGIN_EVENTS = ('login_attempt', 'login_success', 'login_failed')
+
 
 class MongoService:
     def __init__(self):
         self.client = None
         self.db = None
+        self.uri = None
+        self.server_selection_timeout_ms = 2000
+        self.logger = None
+        self.buffered = True
+        self.batch_size = 100
+        self.flush_interval = 1.0
+        self.overflow = 'drop'
+        self.put_timeout = 0.05
+        self.rotation = 'ttl'
+        self.retention_days = 90
+        self._indexed = set()
+        self._queue = None
+        self._writer = None
+        self._exit_hook = False
+        self._lock = threading.Lock()
+        self._counters = {'queued': 0, 'flushed': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
 
     def init_app(self, app):
-        mongo_uri = app.config.get('MONGO_URI')
-        if mongo_uri:
-            try:
-                self.client = MongoClient(mongo_uri)
-                # The ismaster command is cheap and does not require auth.
-                self.client.admin.command('ismaster')
-                self.db = self.client.get_default_database()
-                app.logger.info("MongoDB connection successful.")
-            except ConnectionFailure as e:
-                app.logger.error(f"Could not connect to MongoDB: {e}")
-                self.client = None
-                self.db = None
-        else:
+        self.logger = app.logger
+        self.buffered = app.config.get('MONGO_EVENT_BUFFERED', True)
+        self.batch_size = app.config.get('MONGO_EVENT_BATCH_SIZE', 100)
+        self.flush_interval = app.config.get('MONGO_EVENT_FLUSH_INTERVAL', 1.0)
+        self.overflow = app.config.get('MONGO_EVENT_OVERFLOW', 'drop')
+        self.put_timeout = app.config.get('MONGO_EVENT_PUT_TIMEOUT', 0.05)
+        self.rotation = app.config.get('MONGO_EVENT_ROTATION', 'ttl')
+        self.retention_days = app.config.get('MONGO_EVENT_RETENTION_DAYS', 90)
+        self._indexed = set()
+        # flush what the current writer still holds before it loses its queue
+        self.shutdown()
+        self._queue = queue.Queue(maxsize=app.config.get('MONGO_EVENT_QUEUE_SIZE', 10000))
+        if not self._exit_hook:
+            atexit.register(self.shutdown)
+            self._exit_hook = True
+        self.server_selection_timeout_ms = app.config.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 2000)
+        # the client is created on first use, so booting a worker never waits on MongoDB
+        self.uri = app.config.get('MONGO_URI')
+        self.client = None
+        self.db = None
+        if not self.uri:
             app.logger.info("MONGO_URI not set, MongoDB logging disabled.")
 
+    def _database(self):
+        if self.db is None and self.uri:
+            with self._lock:
+                if self.db is None and self.uri.startswith('mongomock://'):
+                    # in-process stand-in for development and verification scripts
+                    import mongomock
+                    self.client = mongomock.MongoClient()
+                    self.db = self.client[self.uri[len('mongomock://'):] or 'iquit']
+                elif self.db is None:
+                    from pymongo import MongoClient
+                    self.client = MongoClient(
+                        self.uri,
+                        connect=False,
+                        serverSelectionTimeoutMS=self.server_selection_timeout_ms,
+                    )
+                    self.db = self.client.get_default_database()
+        return self.db
+
+    def health(self):
+        """
+        Reports the connection state without any network round trip:
+        'disabled', 'idle' (not used yet), 'up' or 'down'.
+        """
+        if not self.uri and self.db is None:
+            return 'disabled'
+        if self.client is None:
+            return 'idle'
+        if not hasattr(self.client, 'topology_description'):
+            return 'up'
+        return 'up' if self.client.topology_description.has_readable_server() else 'down'
+
     def log_event(self, event_type, data):
-        if self.db is not None:
+        if not self.uri and self.db is None:
+            return
+        started = time.perf_counter()
+        try:
+            self._log_event(event_type, data)
+        finally:
+            record_mongo_time(time.perf_counter() - started)
+
+    def _log_event(self, event_type, data):
+        event_data = event_document(event_type, data)
+        if not self.buffered:
             try:
-                collection = self.db['events']
-                event_data = {
-                    'event_type': event_type,
-                    'data': data,
-                    'timestamp': datetime.utcnow()
-                }
-                collection.insert_one(event_data)
+                self._collection(event_data['ts']).insert_one(event_data)
             except Exception as e:
-                current_app.logger.error(f"Failed to log event to MongoDB: {e}")
+                # may run after the request (response.call_on_close), outside the app context
+                if self.logger is not None:
+                    self.logger.error(f"Failed to log event to MongoDB: {e}")
+            return
+        self._ensure_writer()
+        try:
+            if self.overflow == 'block':
+                # backpressure: wait a bounded time for room, then give up
+                self._queue.put(event_data, timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait(event_data)
+        except queue.Full:
+            self._count('dropped')
+            return
+        self._count('queued')
 
-mongo_service = MongoService()
+    def flush(self, timeout=5.0):
+        """
+        Blocks until every event queued so far has been written (or dropped).
+        """
+        if self._writer is None:
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def shutdown(self, timeout=5.0):
+        writer = self._writer
+        if writer is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        writer.join(timeout)
+        self._writer = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['pending'] = self._queue.qsize() if self._queue is not None else 0
+        return stats
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._counters[key] += n
 
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._run, name='mongo-event-writer', daemon=True)
+            self._writer.start()
+
+    def _run(self):
+        # bound to the queue it was started for; init_app may install a new one
+        events = self._queue
+        batch = []
+        waiters = []
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+        while not stopping:
+            try:
+                item = events.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                stopping = True
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not None:
+                batch.append(item)
+            # drain whatever is already waiting without blocking
+            while len(batch) < self.batch_size and not stopping:
+                try:
+                    item = events.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+            due = time.monotonic() >= deadline
+            if batch and (len(batch) >= self.batch_size or due or waiters or stopping):
+                self._write(batch)
+                batch = []
+            if due or not batch:
+                deadline = time.monotonic() + self.flush_interval
+            for waiter in waiters:
+                waiter.set()
+            waiters = []
+
+    def _write(self, batch):
+        by_collection = {}
+        for event in batch:
+            by_collection.setdefault(self.collection_name(event['ts']), []).append(event)
+        for name, events in by_collection.items():
+            try:
+                self._collection(name=name).insert_many(events, ordered=False)
+                self._count('flushed', len(events))
+                self._count('batches')
+            except Exception as e:
+                self._count('failed', len(events))
+                if self.logger is not None:
+                    self.logger.error(f"Failed to write {len(events)} events to MongoDB: {e}")
+
+    def collection_name(self, ts):
+        if self.rotation == 'monthly':
+            return f'{EVENT_COLLECTION}_{ts:%Y_%m}'
+        return EVENT_COLLECTION
+
+    def _collection(self, ts=None, name=None):
+        name = name or self.collection_name(ts)
+        collection = self._database()[name]
+        if name not in self._indexed:
+            self._ensure_indexes(collection)
+            self._indexed.add(name)
+        return collection
+
+    def _ensure_indexes(self, collection):
+        collection.create_index([('type', 1), ('ts', 1)])
+        collection.create_index([('user_id', 1), ('ts', 1)], sparse=True)
+        if self.rotation == 'ttl' and self.retention_days:
+            expire = int(self.retention_days * 86400)
+            try:
+                collection.create_index('ts', expireAfterSeconds=expire)
+            except Exception:
+                # the retention changed: update the existing TTL index in place
+                self._database().command('collMod', collection.name,
+                                         index={'keyPattern': {'ts': 1}, 'expireAfterSeconds': expire})
+
+    def rotate(self, now=None):
+        """
+        Prepares this and next month's collections (indexes, or the TTL index in
+        'ttl' mode) and, in 'monthly' mode, drops collections whose whole month is
+        older than the retention period. Returns the names of dropped collections.
+        """
+        if self._database() is None:
+            return []
+        now = now or datetime.utcnow()
+        next_month = (now.replace(day=1) + timedelta(days=32)).replace(day=1)
+        for ts in (now, next_month):
+            self._collection(ts)
+        if self.rotation != 'monthly' or not self.retention_days:
+            return []
+        cutoff = now - timedelta(days=self.retention_days)
+        dropped = []
+        for name in self._database().list_collection_names():
+            match = _MONTHLY_COLLECTION.match(name)
+            if not match:
+                continue
+            month_end = (datetime(int(match[1]), int(match[2]), 1) + timedelta(days=32)).replace(day=1)
+            if month_end <= cutoff:
+                self._database().drop_collection(name)
+                self._indexed.discard(name)
+                dropped.append(name)
+        return dropped
+
+    def summarize(self, start, end, window='day', event_types=None, type_pattern=None, user_field='user_id'):
+        """
+        Event counts per window ('hour', 'day' or 'month') and type in [start, end),
+        with the number of distinct users (distinct values of `user_field`), computed
+        by an aggregation pipeline on the (type, ts) index. Filter with a list of
+        `event_types` or a regex `type_pattern`.
+        Returns [{'window', 'type', 'count', 'users'}] sorted by window.
+        """
+        if window not in SUMMARY_WINDOWS or self._database() is None:
+            return []
+        match = {'ts': {'$gte': start, '$lt': end}}
+        if event_types:
+            match['type'] = {'$in': list(event_types)}
+        elif type_pattern:
+            match['type'] = {'$regex': type_pattern}
+        pipeline = [
+            {'$match': match},
+            {'$group': {
+                '_id': {
+                    'window': {'$dateToString': {'format': SUMMARY_WINDOWS[window], 'date': '$ts'}},
+                    'type': '$type',
+                    'user': f'${user_field}',
+                },
+                'count': {'$sum': 1},
+            }},
+            {'$group': {
+                '_id': {'window': '$_id.window', 'type': '$_id.type'},
+                'count': {'$sum': '$count'},
+                'users': {'$sum': {'$cond': [{'$gt': ['$_id.user', None]}, 1, 0]}},
+            }},
+        ]
+        existing = set(self._database().list_collection_names())
+        results = []
+        for name in self._collections_between(start, end):
+            if name in existing:
+                results.extend(self._database()[name].aggregate(pipeline))
+        rows = [dict(r['_id'], count=r['count'], users=r['users']) for r in results]
+        return sorted(rows, key=lambda r: (r['window'], r['type']))
+
+    def login_summary(self, start, end, window='day'):
+        # attempts and failures for unknown accounts have no user id; every login event has the email
+        return self.summarize(start, end, window, event_types=LOGIN_EVENTS, user_field='email')
+
+    def request_summary(self, start, end, window='day'):
+        return self.summarize(start, end, window, type_pattern='_request$')
+
+    def _collections_between(self, start, end):
+        if self.rotation != 'monthly':
+            return [EVENT_COLLECTION]
+        names = []
+        month = start.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        while month < end:
+            names.append(self.collection_name(month))
+            month = (month + timedelta(days=32)).replace(day=1)
+        return names
+
+
+def event_document(event_type, data, ts=None):
+    """
+    Flat event document: {'type', 'ts', 'user_id'?, ...}. Nested dicts are
+    flattened into 'parent_child' keys and 'user_email' is stored as 'email'.
+    """
+    document = {'type': event_type, 'ts': ts or datetime.utcnow()}
+    _flatten(document, data or {}, '')
+    return document
+
+
+def _flatten(document, data, prefix):
+    for key, value in data.items():
+        if key == 'user_email':
+            key = 'email'
+        if isinstance(value, dict):
+            _flatten(document, value, f'{prefix}{key}_')
+        elif value is not None:
+            document[prefix + key] = value
+
+mongo_service = MongoService()
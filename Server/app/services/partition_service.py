@@ -0,0 +1,160 @@
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import column, delete, select, table, text
+from app.extensions import db
+from app.models.consumption import Consumption, ConsumptionArchive, ConsumptionIdempotencyKey
+from app.services.rollup_service import forget_rows
+
+PARENT_TABLE = 'consumption'
+DEFAULT_PARTITION = 'consumption_default'
+_MONTHLY_PARTITION = re.compile(r'^consumption_(\d{4})_(\d{2})$')
+ARCHIVE_COLUMNS = ('id', 'user_id', 'timestamp', 'substance_type', 'quantity', 'unit', 'cost', 'notes')
+# what dropping a debug row has to undo: its rollup counts and its idempotency key
+FORGET_COLUMNS = ('id', 'user_id', 'timestamp', 'substance_type', 'quantity', 'cost')
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{PARENT_TABLE}_{month:%Y_%m}'
+
+
+def is_partitioned():
+    """
+    True when consumption is a partitioned Postgres table (after the
+    partition_consumption migration); SQLite and create_all() tables are plain.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    return db.session.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name)"
+    ), {'name': PARENT_TABLE}).first() is not None
+
+
+def list_partitions():
+    """{month start: partition name} for the monthly partitions of consumption."""
+    rows = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:name)"
+    ), {'name': PARENT_TABLE})
+    partitions = {}
+    for (name,) in rows:
+        match = _MONTHLY_PARTITION.match(name)
+        if match:
+            partitions[datetime(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+def ensure_partitions(first_month, months_ahead):
+    """
+    Creates the monthly partitions from `first_month` through `months_ahead` months
+    later that do not exist yet. Rows already sitting in the default partition for
+    such a month are moved into it. Returns the names of created partitions.
+    """
+    existing = list_partitions()
+    created = []
+    for n in range(months_ahead + 1):
+        month = add_months(first_month, n)
+        if month in existing:
+            continue
+        name = partition_name(month)
+        bounds = {'start': month, 'end': add_months(month, 1)}
+        # built detached and attached afterwards, so rows can be moved out of the default partition;
+        # the lock (held until commit) keeps rows committed between the copy and the delete from being lost
+        db.session.execute(text(f'LOCK TABLE {DEFAULT_PARTITION} IN SHARE ROW EXCLUSIVE MODE'))
+        db.session.execute(text(f'CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+        in_month = 'WHERE "timestamp" >= :start AND "timestamp" < :end'
+        db.session.execute(text(f'INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} {in_month}'), bounds)
+        db.session.execute(text(f'DELETE FROM {DEFAULT_PARTITION} {in_month}'), bounds)
+        db.session.execute(text(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{bounds['end']:%Y-%m-%d}')"
+        ))
+        created.append(name)
+    return created
+
+
+def archive_months(before):
+    """
+    Moves every row older than `before` (a month start) into consumption_archive,
+    dropping debug rows along with their rollup counts. Idempotency keys of archived
+    rows stay in consumption_idempotency_key, so their replays are still reported
+    as duplicates. Whole monthly partitions are detached, copied and dropped,
+    so the live table's indexes never carry cold history; rows elsewhere (SQLite,
+    or the Postgres default partition) are moved with INSERT ... SELECT and DELETE.
+    Returns {'rows': archived row count, 'dropped': dropped partition names}.
+    """
+    archive = ConsumptionArchive.__table__
+    archived = 0
+    dropped = []
+    if is_partitioned():
+        for month, name in sorted(list_partitions().items()):
+            if add_months(month, 1) > before:
+                continue
+            db.session.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}'))
+            detached = table(name, *(column(c) for c in ARCHIVE_COLUMNS + ('is_debug',)))
+            _forget(detached, detached.c.is_debug.is_(True))
+            source = select(*(detached.c[c] for c in ARCHIVE_COLUMNS)).where(detached.c.is_debug.isnot(True))
+            archived += db.session.execute(archive.insert().from_select(ARCHIVE_COLUMNS, source)).rowcount
+            db.session.execute(text(f'DROP TABLE {name}'))
+            dropped.append(name)
+    live = Consumption.__table__
+    source = select(*(live.c[c] for c in ARCHIVE_COLUMNS)).where(
+        live.c.timestamp < before,
+        live.c.is_debug.isnot(True)
+    )
+    archived += db.session.execute(archive.insert().from_select(ARCHIVE_COLUMNS, source)).rowcount
+    _forget(live, live.c.timestamp < before, live.c.is_debug.is_(True))
+    db.session.execute(delete(live).where(live.c.timestamp < before))
+    return {'rows': archived, 'dropped': dropped}
+
+
+def purge_debug(before):
+    """
+    Deletes debug rows older than `before`, with their rollup counts and idempotency
+    keys. Returns the number of rows deleted.
+    """
+    live = Consumption.__table__
+    purged = (live.c.timestamp < before, live.c.is_debug.is_(True))
+    _forget(live, *purged)
+    return db.session.execute(delete(live).where(*purged)).rowcount
+
+
+def _forget(source, *where):
+    # for rows of `source` (consumption or a detached partition) about to be deleted
+    rows = select(*(source.c[c] for c in FORGET_COLUMNS)).where(*where).subquery()
+    forget_rows(rows)
+    db.session.execute(delete(ConsumptionIdempotencyKey.__table__).where(
+        ConsumptionIdempotencyKey.consumption_id.in_(select(rows.c.id))
+    ))
+
+
+def run_maintenance(now=None, months_ahead=3, archive_after_months=12, debug_retention_days=30):
+    """
+    Creates partitions for the current month and `months_ahead` more (Postgres),
+    purges debug rows older than `debug_retention_days` and archives months older
+    than `archive_after_months`. Zero disables the purge or the archival. Daily
+    rollups are left alone, so stats keep covering archived months.
+    Returns a summary dict.
+    """
+    now = now or datetime.utcnow()
+    current = month_start(now)
+    partitioned = is_partitioned()
+    summary = {'partitioned': partitioned, 'created': [], 'purged_debug': 0, 'archived': 0, 'dropped': []}
+    if partitioned:
+        summary['created'] = ensure_partitions(current, months_ahead)
+    if debug_retention_days:
+        summary['purged_debug'] = purge_debug(now - timedelta(days=debug_retention_days))
+    if archive_after_months:
+        result = archive_months(add_months(current, -archive_after_months))
+        summary['archived'] = result['rows']
+        summary['dropped'] = result['dropped']
+    db.session.commit()
+    return summary
@@ -0,0 +1,126 @@
+import atexit
+import base64
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+# bcrypt reads at most 72 bytes of a password; bcrypt >= 5 rejects longer ones
+BCRYPT_MAX_BYTES = 72
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hashing jobs are already waiting for the pool."""
+
+
+def _bcrypt_secret(password):
+    secret = password.encode('utf-8')
+    if len(secret) > BCRYPT_MAX_BYTES:
+        # base64 of the digest: 44 bytes, no NUL bytes, every character counts
+        secret = base64.b64encode(hashlib.sha256(secret).digest())
+    return secret
+
+
+def _hash(password, algorithm, cost):
+    if algorithm == 'bcrypt':
+        return bcrypt.hashpw(_bcrypt_secret(password), bcrypt.gensalt(rounds=cost)).decode('ascii')
+    return generate_password_hash(password, method=f'pbkdf2:sha256:{cost}')
+
+
+def _verify(password_hash, password):
+    if not password_hash:
+        return False
+    if password_hash.startswith('$2'):
+        return bcrypt.checkpw(_bcrypt_secret(password), password_hash.encode('ascii'))
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords with a configurable algorithm ('bcrypt' or 'pbkdf2')
+    and cost (bcrypt rounds or PBKDF2 iterations). With PASSWORD_HASH_WORKERS > 0 the
+    CPU-bound work runs on a process pool so it doesn't hold the GIL of the serving
+    process; at most PASSWORD_HASH_MAX_PENDING jobs may wait for it at a time.
+    """
+
+    def __init__(self):
+        self.algorithm = 'bcrypt'
+        self.cost = 12
+        self.workers = 0
+        self.timeout = 10.0
+        self.start_method = 'spawn'
+        self._slots = None
+        self._pool = None
+        self._exit_hook = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.algorithm = app.config.get('PASSWORD_HASH_ALGORITHM', 'bcrypt')
+        default_cost = 12 if self.algorithm == 'bcrypt' else 600000
+        self.cost = app.config.get('PASSWORD_HASH_COST') or default_cost
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 0)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10.0)
+        self.start_method = app.config.get('PASSWORD_HASH_START_METHOD', 'spawn')
+        max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING') or self.workers * 4
+        self._slots = threading.BoundedSemaphore(max_pending) if self.workers else None
+        self.shutdown()
+        if not self._exit_hook:
+            atexit.register(self.shutdown)
+            self._exit_hook = True
+
+    def hash(self, password):
+        return self._run(_hash, password, self.algorithm, self.cost)
+
+    def verify(self, password_hash, password):
+        return self._run(_verify, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """
+        True when `password_hash` was made with another algorithm or cost than the configured one.
+        """
+        if not password_hash:
+            return False
+        if password_hash.startswith('$2'):
+            # $2b$<rounds>$<salt+hash>
+            return self.algorithm != 'bcrypt' or int(password_hash.split('$')[2]) != self.cost
+        method = password_hash.split('$', 1)[0]
+        return self.algorithm != 'pbkdf2' or method != f'pbkdf2:sha256:{self.cost}'
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy()
+        try:
+            return self._executor().submit(func, *args).result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise PasswordHasherBusy()
+        except BrokenProcessPool:
+            # a worker died; start a fresh pool next time and answer this call inline
+            self.shutdown()
+            return func(*args)
+        finally:
+            self._slots.release()
+
+    def _executor(self):
+        # created lazily so each gunicorn worker gets its own pool after forking
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method)
+                )
+            return self._pool
+
+
+password_hasher = PasswordHasher()
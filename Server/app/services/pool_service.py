@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.pool import Pool, QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.services.timezone_service import sqlite_local_time
+
+
+class PoolMetrics:
+    """
+    Process-wide counters for connection checkouts from InstrumentedQueuePool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+
+    def record(self, waited, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': self.wait_seconds_total,
+                'wait_seconds_max': self.wait_seconds_max,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records how long each checkout waited for a connection
+    (including time spent opening a new one).
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_metrics.record(time.perf_counter() - started)
+        return connection
+
+
+def pool_stats(engine):
+    """
+    Current pool occupancy plus the checkout wait counters.
+    """
+    pool = engine.pool
+    stats = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    stats.update(pool_metrics.snapshot())
+    return stats
+
+
+_sqlite_pragmas = {}
+
+
+def configure_sqlite(pragmas):
+    """
+    PRAGMA statements applied to every new SQLite connection, e.g. {'journal_mode': 'WAL'}.
+    """
+    _sqlite_pragmas.clear()
+    _sqlite_pragmas.update(pragmas)
+
+
+@event.listens_for(Pool, 'connect')
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    # SQLite has no time zone database; see aggregation_service.local_timestamp
+    dbapi_connection.create_function('iquit_local_time', 2, sqlite_local_time, deterministic=True)
+    if not _sqlite_pragmas:
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in _sqlite_pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
@@ -0,0 +1,96 @@
+from datetime import datetime, date, timedelta
+from sqlalchemy import and_, func
+from app.models.user import User
+from app.models.daily_rollup import DailyConsumptionRollup
+from app.models.weekly_report import WeeklyReport
+from app.extensions import db
+from app.services.aggregation_service import as_date
+from app.services.analytics_service import bulk_analytics, load_created_days
+
+
+ANALYTICS_FIELDS = ('current_streak', 'longest_streak', 'rolling_7', 'rolling_30', 'trend_slope', 'money_saved')
+
+
+def last_week_start(today=None):
+    """
+    Monday of the most recent full week before `today`.
+    """
+    today = today or date.today()
+    return today - timedelta(days=today.weekday() + 7)
+
+
+def user_id_ranges(chunk_size=1000):
+    """
+    Splits the user id space into inclusive (first, last) ranges of `chunk_size` ids.
+    """
+    low, high = db.session.query(func.min(User.id), func.max(User.id)).one()
+    if low is None:
+        return []
+    return [(start, min(start + chunk_size - 1, high)) for start in range(low, high + 1, chunk_size)]
+
+
+def compute_weekly_reports(first_user_id, last_user_id, week_start):
+    """
+    Computes and stores the WeeklyReport of every user in [first_user_id, last_user_id]
+    for the week starting on `week_start`, using one grouped query over the daily rollup,
+    plus the range's analytics computed in bulk. Returns the number of reports written.
+    """
+    week_end = week_start + timedelta(days=6)
+    rollup = DailyConsumptionRollup
+    rows = db.session.query(
+        User.id,
+        rollup.day,
+        func.coalesce(func.sum(rollup.count), 0),
+        func.coalesce(func.sum(rollup.quantity_sum), 0.0),
+        func.coalesce(func.sum(rollup.cost_sum), 0.0)
+    ).outerjoin(rollup, and_(
+        rollup.user_id == User.id,
+        rollup.day >= week_start,
+        rollup.day <= week_end
+    )).filter(
+        User.id.between(first_user_id, last_user_id)
+    ).group_by(User.id, rollup.day).all()
+
+    reports = {}
+    for user_id, day, count, quantity, cost in rows:
+        report = reports.setdefault(user_id, {
+            'user_id': user_id,
+            'week_start': week_start,
+            'total_count': 0,
+            'total_quantity': 0.0,
+            'total_cost': 0.0,
+            'daily_counts': [0] * 7,
+        })
+        if day is None:
+            continue
+        report['daily_counts'][(as_date(day) - week_start).days] = int(count)
+        report['total_count'] += int(count)
+        report['total_quantity'] += float(quantity)
+        report['total_cost'] += float(cost)
+    now = datetime.utcnow()
+    analytics = bulk_analytics(reports, week_end, load_created_days(list(reports))) if reports else {}
+    for user_id, report in reports.items():
+        report['average'] = report['total_count'] / 7
+        report['generated_at'] = now
+        metrics = analytics[user_id]
+        for field in ANALYTICS_FIELDS:
+            report[field] = metrics[field]
+
+    db.session.query(WeeklyReport).filter(
+        WeeklyReport.week_start == week_start,
+        WeeklyReport.user_id.between(first_user_id, last_user_id)
+    ).delete(synchronize_session=False)
+    if reports:
+        db.session.execute(WeeklyReport.__table__.insert(), list(reports.values()))
+    db.session.commit()
+    return len(reports)
+
+
+def get_weekly_report(user_id, week_start=None):
+    """
+    Returns the user's report for `week_start`, or their most recent one.
+    """
+    query = WeeklyReport.query.filter(WeeklyReport.user_id == user_id)
+    if week_start is not None:
+        return query.filter(WeeklyReport.week_start == week_start).first()
+    return query.order_by(WeeklyReport.week_start.desc()).first()
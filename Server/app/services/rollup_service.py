@@ -0,0 +1,161 @@
+from sqlalchemy import func, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models.consumption import Consumption, ConsumptionArchive
+from app.models.user import User
+from app.models.daily_rollup import DailyConsumptionRollup
+from app.extensions import db
+from app.services.cache_service import response_cache
+from app.services.aggregation_service import as_date, local_day
+from app.services.timezone_service import DEFAULT_TIMEZONE, local_date
+
+
+def _insert():
+    if db.engine.dialect.name == 'postgresql':
+        return postgresql.insert(DailyConsumptionRollup.__table__)
+    return sqlite.insert(DailyConsumptionRollup.__table__)
+
+
+def record_consumptions(entries, tz_name=DEFAULT_TIMEZONE):
+    """
+    Adds the given Consumption entries to the daily rollup within the current
+    transaction, on the local day in `tz_name` (the timezone of the entries' user).
+    Callers commit together with the entries themselves.
+    """
+    record_rows([
+        {'user_id': e.user_id, 'timestamp': e.timestamp, 'substance_type': e.substance_type,
+         'quantity': e.quantity, 'cost': e.cost}
+        for e in entries
+    ], tz_name)
+
+
+def record_rows(rows, tz_name=DEFAULT_TIMEZONE):
+    """
+    Same as record_consumptions, for plain dicts of consumption column values
+    (as passed to a Core insert).
+    """
+    groups = {}
+    for row in rows:
+        key = (row['user_id'], local_date(row['timestamp'], tz_name), row['substance_type'])
+        count, quantity, cost = groups.get(key, (0, 0.0, 0.0))
+        groups[key] = (count + 1, quantity + (row.get('quantity') or 0.0), cost + (row.get('cost') or 0.0))
+    if not groups:
+        return
+    response_cache.invalidate_on_commit(db.session, {user_id for user_id, _, _ in groups})
+    rows = [
+        {
+            'user_id': user_id,
+            'day': day,
+            'substance_type': substance,
+            'count': count,
+            'quantity_sum': quantity,
+            'cost_sum': cost,
+        }
+        for (user_id, day, substance), (count, quantity, cost) in groups.items()
+    ]
+    stmt = _insert()
+    table = DailyConsumptionRollup.__table__
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.day, table.c.substance_type],
+        set_={
+            'count': table.c.count + stmt.excluded.count,
+            'quantity_sum': table.c.quantity_sum + stmt.excluded.quantity_sum,
+            'cost_sum': table.c.cost_sum + stmt.excluded.cost_sum,
+        }
+    )
+    db.session.execute(stmt, rows)
+
+
+def forget_rows(rows):
+    """
+    Subtracts `rows` (a subquery of consumption user_id, timestamp, substance_type,
+    quantity and cost) from the daily rollup within the current transaction, so
+    deleting them leaves the rollup equal to a rebuild. Call it before the delete.
+    """
+    day = local_day(rows.c.timestamp, User.timezone)
+    groups = db.session.execute(select(
+        rows.c.user_id,
+        day,
+        rows.c.substance_type,
+        func.count(),
+        func.coalesce(func.sum(rows.c.quantity), 0.0),
+        func.coalesce(func.sum(rows.c.cost), 0.0)
+    ).join(
+        User, User.id == rows.c.user_id
+    ).group_by(rows.c.user_id, day, rows.c.substance_type)).all()
+    if not groups:
+        return
+    table = DailyConsumptionRollup.__table__
+    for user_id, local, substance, count, quantity, cost in groups:
+        db.session.execute(table.update().where(
+            table.c.user_id == user_id,
+            table.c.day == as_date(local),
+            table.c.substance_type == substance
+        ).values(
+            count=table.c.count - count,
+            quantity_sum=table.c.quantity_sum - quantity,
+            cost_sum=table.c.cost_sum - cost
+        ))
+    user_ids = {group[0] for group in groups}
+    db.session.execute(table.delete().where(table.c.user_id.in_(user_ids), table.c.count <= 0))
+    response_cache.invalidate_on_commit(db.session, user_ids)
+
+
+def rebuild_rollups(user_id=None, chunk_size=1000):
+    """
+    Recomputes the rollup from raw Consumption rows, archived ones included, for one
+    user or for everyone.
+    Full rebuilds run in user id ranges of `chunk_size`, one transaction per range.
+    Returns the number of rollup rows written.
+    """
+    if user_id is not None:
+        written = _rebuild_range(user_id, user_id)
+        db.session.commit()
+        return written
+    rows = _history_rows()
+    low, high = db.session.query(func.min(rows.c.user_id), func.max(rows.c.user_id)).one()
+    stale = db.session.query(DailyConsumptionRollup)
+    if low is not None:
+        stale = stale.filter(~DailyConsumptionRollup.user_id.between(low, high))
+    stale.delete(synchronize_session=False)
+    db.session.commit()
+    written = 0
+    if low is None:
+        return written
+    for start in range(low, high + 1, chunk_size):
+        written += _rebuild_range(start, start + chunk_size - 1)
+        db.session.commit()
+    return written
+
+
+def _rebuild_range(first_user_id, last_user_id):
+    db.session.query(DailyConsumptionRollup).filter(
+        DailyConsumptionRollup.user_id.between(first_user_id, last_user_id)
+    ).delete(synchronize_session=False)
+    rows = _history_rows(first_user_id, last_user_id)
+    day = local_day(rows.c.timestamp, User.timezone)
+    source = select(
+        rows.c.user_id,
+        day,
+        rows.c.substance_type,
+        func.count(),
+        func.coalesce(func.sum(rows.c.quantity), 0.0),
+        func.coalesce(func.sum(rows.c.cost), 0.0)
+    ).join(
+        User, User.id == rows.c.user_id
+    ).group_by(rows.c.user_id, day, rows.c.substance_type)
+    stmt = DailyConsumptionRollup.__table__.insert().from_select(
+        ['user_id', 'day', 'substance_type', 'count', 'quantity_sum', 'cost_sum'],
+        source
+    )
+    return db.session.execute(stmt).rowcount
+
+
+def _history_rows(first_user_id=None, last_user_id=None):
+    # live and archived entries as one subquery, filtered per branch so each uses its index
+    selects = []
+    for model in (Consumption, ConsumptionArchive):
+        query = select(model.user_id, model.timestamp, model.substance_type, model.quantity, model.cost)
+        if first_user_id is not None:
+            query = query.where(model.user_id.between(first_user_id, last_user_id))
+        selects.append(query)
+    return union_all(*selects).subquery()
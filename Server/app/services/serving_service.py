@@ -0,0 +1,49 @@
+import sys
+from flask import _app_ctx_stack
+
+try:
+    from greenlet import getcurrent as _current
+except ImportError:
+    from threading import get_ident as _current
+
+# 'sync': gthread workers, one thread per in-flight request.
+# 'gevent': cooperative workers; every blocking socket call (psycopg2 via psycogreen,
+# pymongo, redis) yields to other requests.
+SERVING_MODES = ('sync', 'gevent')
+
+
+def session_scope():
+    """
+    Scope key for db.session: the current app context, so every request, greenlet
+    or Celery task that pushes one gets its own session. Outside an app context the
+    current greenlet (or thread) is used.
+    """
+    ctx = _app_ctx_stack.top
+    return id(ctx) if ctx is not None else _current()
+
+
+def gevent_active():
+    """True when gevent has monkey-patched the socket module (gevent worker or pool)."""
+    if 'gevent' not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched('socket')
+
+
+def init_app(app):
+    """
+    Makes the database driver cooperative when running under gevent (gunicorn's
+    gevent worker or `celery worker -P gevent`). psycopg2 talks to Postgres through
+    libpq rather than Python sockets, so monkey patching alone would block the whole
+    worker on every query.
+    """
+    mode = app.config.get('SERVING_MODE', 'sync')
+    if mode not in SERVING_MODES:
+        raise ValueError(f"SERVING_MODE must be one of {', '.join(SERVING_MODES)}")
+    if not gevent_active():
+        if mode == 'gevent':
+            app.logger.warning('SERVING_MODE=gevent but gevent is not active; serving synchronously.')
+        return
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'):
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
@@ -1,45 +1,29 @@
-from datetime import datetime, date, timedelta
 from sqlalchemy import func
-from app.models.consumption import Consumption
+from app.models.daily_rollup import DailyConsumptionRollup
 from app import db
+from app.services.aggregation_service import daily_counts
+from app.services.timezone_service import local_today
 
 
 def get_today_stats(user):
     """
-    Returns today's total consumption count and total cost for the user.
+    Returns the total consumption count and cost of the user's current local day.
     """
-    today = date.today()
-    start = datetime.combine(today, datetime.min.time())
-    end = start + timedelta(days=1)
     row = db.session.query(
-        func.count(Consumption.id),
-        func.coalesce(func.sum(Consumption.cost), 0.0)
+        func.coalesce(func.sum(DailyConsumptionRollup.count), 0),
+        func.coalesce(func.sum(DailyConsumptionRollup.cost_sum), 0.0)
     ).filter(
-        Consumption.user_id == user.id,
-        Consumption.timestamp >= start,
-        Consumption.timestamp < end
+        DailyConsumptionRollup.user_id == user.id,
+        DailyConsumptionRollup.day == local_today(user.timezone)
     ).one()
-    return {'count': row[0], 'total_cost': float(row[1])}
+    return {'count': int(row[0]), 'total_cost': float(row[1])}
 
 
-def get_weekly_stats(user):
+def get_weekly_stats(user, days=7):
     """
-    Returns a list of daily counts and the overall average for the past 7 days.
+    Returns a list of daily counts and the overall average for the past `days` days.
     """
-    today = date.today()
-    start_date = today - timedelta(days=6)
-    daily = []
-    total = 0
-    for i in range(7):
-        day = start_date + timedelta(days=i)
-        day_start = datetime.combine(day, datetime.min.time())
-        day_end = day_start + timedelta(days=1)
-        count = db.session.query(func.count(Consumption.id)).filter(
-            Consumption.user_id == user.id,
-            Consumption.timestamp >= day_start,
-            Consumption.timestamp < day_end
-        ).scalar()
-        daily.append({'date': day.isoformat(), 'count': count})
-        total += count
-    average = total / 7
+    daily = daily_counts(user.id, days, tz_name=user.timezone)
+    total = sum(d['count'] for d in daily)
+    average = total / days
     return {'daily': daily, 'average': average}
@@ -0,0 +1,68 @@
+from datetime import datetime, date, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DEFAULT_TIMEZONE = 'UTC'
+
+
+@lru_cache(maxsize=512)
+def get_zone(name):
+    """
+    Returns the ZoneInfo for an IANA name such as 'Europe/Paris'.
+    Raises ValueError for an unknown zone.
+    """
+    try:
+        return ZoneInfo(name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError, TypeError) as e:
+        raise ValueError('Invalid timezone') from e
+
+
+def to_utc(value):
+    """
+    Timestamps are stored as naive UTC; aware values are converted, naive ones kept.
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def local_now(tz_name):
+    return datetime.now(get_zone(tz_name))
+
+
+def local_today(tz_name):
+    return local_now(tz_name).date()
+
+
+def local_date(utc_timestamp, tz_name):
+    """The user's calendar day of a naive UTC timestamp."""
+    return utc_timestamp.replace(tzinfo=timezone.utc).astimezone(get_zone(tz_name)).date()
+
+
+def utc_bounds(first_day, last_day, tz_name):
+    """
+    Naive UTC [start, end) covering the local days first_day..last_day inclusive.
+    Days are 23 or 25 hours long across DST changes, so the bounds come from the
+    zone rather than from adding 24h.
+    """
+    zone = get_zone(tz_name)
+    start = datetime.combine(first_day, time.min, zone)
+    end = datetime.combine(last_day + timedelta(days=1), time.min, zone)
+    return to_utc(start), to_utc(end)
+
+
+def sqlite_local_time(utc_timestamp, tz_name):
+    """
+    SQLite function shifting a stored naive UTC timestamp to the user's wall-clock
+    time ('YYYY-MM-DD HH:MM:SS'), so date() buckets by the local day.
+    """
+    if utc_timestamp is None:
+        return None
+    try:
+        value = datetime.fromisoformat(utc_timestamp) if isinstance(utc_timestamp, str) else utc_timestamp
+        if isinstance(value, date) and not isinstance(value, datetime):
+            value = datetime.combine(value, time.min)
+        local = value.replace(tzinfo=timezone.utc).astimezone(get_zone(tz_name))
+    except ValueError:
+        return None
+    return local.strftime('%Y-%m-%d %H:%M:%S')
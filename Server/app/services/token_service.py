@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from flask import current_app
+from flask_jwt_extended import create_access_token, create_refresh_token
+from app.services.cache_service import MemoryBackend, RedisBackend
+
+DEBUG_EMAIL = 'debug@iquit.dev'
+REVOCATION_BACKENDS = ('redis', 'memory')
+
+
+def user_claims(user):
+    """
+    Claims embedded in access tokens so requests can resolve current_user without
+    a database lookup. `user` needs email, created_at and timezone.
+    """
+    return {
+        'email': user.email,
+        'tz': user.timezone,
+        'created': user.created_at.isoformat() if user.created_at else None,
+        'debug': bool(current_app.config.get('DEBUG_FAKE_DATA')) and user.email == DEBUG_EMAIL,
+    }
+
+
+def issue_tokens(user):
+    """
+    Returns {'token', 'refresh_token'} for the user. The identity is the immutable
+    user id, so changing the email no longer orphans tokens. Both carry `issued`,
+    the issue time with sub-second precision (`iat` has whole seconds), so a
+    per-user cutoff tells apart tokens issued within the same second.
+    """
+    identity = str(user.id)
+    issued = {'issued': round(time.time(), 6)}
+    return {
+        'token': create_access_token(identity=identity, additional_claims=dict(user_claims(user), **issued)),
+        'refresh_token': create_refresh_token(identity=identity, additional_claims=issued),
+    }
+
+
+def parse_created(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+class RevocationList:
+    """
+    Revoked token ids (jti) and per-user cutoffs ("tokens issued before T are
+    invalid"), stored in Redis so every worker sees them, with an in-process LRU
+    in front. Lookups that found nothing are remembered for
+    TOKEN_REVOCATION_CACHE_TTL seconds, which bounds how long another worker can
+    keep accepting a token revoked elsewhere; revocations made by this process
+    apply immediately. Redis errors are logged and treated as "not revoked", so an
+    outage degrades to plain expiry rather than locking everyone out.
+    """
+
+    def __init__(self):
+        self.backend = MemoryBackend(10000)
+        self.cache_ttl = 30.0
+        self.maxsize = 10000
+        self._front = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0}
+
+    def init_app(self, app):
+        kind = app.config.get('TOKEN_REVOCATION_BACKEND', 'redis')
+        if kind not in REVOCATION_BACKENDS:
+            raise ValueError(f"TOKEN_REVOCATION_BACKEND must be one of {', '.join(REVOCATION_BACKENDS)}")
+        if kind == 'redis':
+            self.backend = RedisBackend(app.config['TOKEN_REVOCATION_REDIS_URL'])
+        else:
+            self.backend = MemoryBackend(app.config.get('TOKEN_REVOCATION_CACHE_SIZE', 10000))
+        self.cache_ttl = app.config.get('TOKEN_REVOCATION_CACHE_TTL', 30.0)
+        self.maxsize = app.config.get('TOKEN_REVOCATION_CACHE_SIZE', 10000)
+        with self._lock:
+            self._front.clear()
+
+    def revoke(self, jwt_data):
+        """Revokes one token until it would have expired anyway."""
+        ttl = _remaining(jwt_data)
+        self.backend.set(f"revoked:{jwt_data['jti']}", b'1', ttl)
+        self._remember(f"revoked:{jwt_data['jti']}", b'1', ttl)
+
+    def revoke_user_tokens(self, user_id, lifetime):
+        """Invalidates every token issued to the user before now; keep `lifetime` >= the longest token lifetime."""
+        cutoff = f'{time.time():.6f}'.encode('ascii')
+        self.backend.set(f'cutoff:{user_id}', cutoff, max(int(lifetime.total_seconds()), 1))
+        self._remember(f'cutoff:{user_id}', cutoff, self.cache_ttl)
+
+    def is_revoked(self, jwt_data):
+        # a revocation never lapses before the token expires, so a hit can be kept that long
+        if self._lookup(f"revoked:{jwt_data['jti']}", hit_ttl=_remaining(jwt_data)):
+            return True
+        cutoff = self._lookup(f"cutoff:{jwt_data['sub']}", hit_ttl=self.cache_ttl)
+        # tokens without `issued` predate it; their whole-second iat errs towards revoking
+        return cutoff is not None and jwt_data.get('issued', jwt_data.get('iat', 0)) < float(cutoff)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, size=len(self._front))
+
+    def _lookup(self, key, hit_ttl):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._front.get(key)
+            if entry is not None and entry[0] >= now:
+                self._front.move_to_end(key)
+                self._counters['hits'] += 1
+                return entry[1]
+            self._counters['misses'] += 1
+        value = self.backend.get(key)
+        self._remember(key, value, self.cache_ttl if value is None else hit_ttl)
+        return value
+
+    def _remember(self, key, value, ttl):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._front[key] = (time.monotonic() + ttl, value)
+            self._front.move_to_end(key)
+            while len(self._front) > self.maxsize:
+                self._front.popitem(last=False)
+
+
+def _remaining(jwt_data):
+    return max(int(jwt_data['exp'] - time.time()), 1)
+
+
+revocation_list = RevocationList()
+
+
+def token_in_blocklist(jwt_header, jwt_data):
+    """JWTManager token_in_blocklist_loader."""
+    return revocation_list.is_revoked(jwt_data)
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app, jsonify
+from app.services.mongo_service import mongo_service
+
+CachedUser = namedtuple('CachedUser', ['id', 'email', 'created_at', 'timezone', 'is_debug'], defaults=(False,))
+
+
+class UserCache:
+    """
+    Per-process LRU + TTL cache mapping a JWT identity to a CachedUser, for tokens
+    that do not carry the user's claims (refresh tokens, and legacy tokens whose
+    identity is the email). Each gunicorn worker has its own copy, so USER_CACHE_TTL
+    bounds how long another worker can serve a stale entry after a profile change.
+    """
+
+    def __init__(self, maxsize=4096, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0}
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('USER_CACHE_SIZE', 4096)
+        self.ttl = app.config.get('USER_CACHE_TTL', 60.0)
+        self.clear()
+
+    def get(self, identity):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(identity)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[identity]
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(identity)
+            self._counters['hits'] += 1
+            return entry[1]
+
+    def put(self, identity, user):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[identity] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(identity)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *identities):
+        with self._lock:
+            for identity in identities:
+                self._entries.pop(identity, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['size'] = len(self._entries)
+        return stats
+
+
+user_cache = UserCache()
+
+
+def load_current_user(jwt_header, jwt_data):
+    """
+    JWTManager user_lookup_loader: resolves `current_user` once per request. Access
+    tokens carry the user's claims, so no query is needed; other tokens go through
+    the cache. Returning None triggers user_lookup_error.
+    """
+    identity = jwt_data[current_app.config.get('JWT_IDENTITY_CLAIM', 'sub')]
+    if 'email' in jwt_data:
+        from app.services.token_service import parse_created
+        return CachedUser(int(identity), jwt_data['email'], parse_created(jwt_data.get('created')),
+                          jwt_data.get('tz') or 'UTC', bool(jwt_data.get('debug')))
+    user = user_cache.get(identity)
+    if user is not None:
+        return user
+    from app.models.user import User
+    from app.extensions import db
+    from app.services.token_service import DEBUG_EMAIL
+    query = db.session.query(User.id, User.email, User.created_at, User.timezone)
+    # tokens issued before ids became the identity carry the email instead
+    row = query.filter_by(id=int(identity)).first() if identity.isdigit() else query.filter_by(email=identity).first()
+    if row is None:
+        return None
+    is_debug = bool(current_app.config.get('DEBUG_FAKE_DATA')) and row.email == DEBUG_EMAIL
+    user = CachedUser(row.id, row.email, row.created_at, row.timezone, is_debug)
+    user_cache.put(identity, user)
+    return user
+
+
+def user_lookup_error(jwt_header, jwt_data):
+    identity = jwt_data.get(current_app.config.get('JWT_IDENTITY_CLAIM', 'sub'))
+    mongo_service.log_event('user_lookup_failure', {'identity': identity, 'reason': 'user_not_found'})
+    return jsonify(message='User not found'), 404
@@ -1,23 +1,38 @@
-from celery import Celery
+from datetime import date, datetime
+from functools import lru_cache
+from celery import Celery, group
+from flask import current_app, has_app_context
 from app.config import Config
 
-def make_celery(app):
+
+@lru_cache(maxsize=None)
+def flask_app():
+    """The worker's Flask app, built on first use rather than at import."""
+    from app import create_app
+    return create_app(mode='worker')
+
+
+def make_celery():
     celery = Celery(
-        app.import_name,
-        broker=app.config['CELERY_BROKER_URL'],
-        backend=app.config['CELERY_RESULT_BACKEND'],
+        __name__,
+        broker=Config.CELERY_BROKER_URL,
+        backend=Config.CELERY_RESULT_BACKEND,
+    )
+    # only Celery's own settings; the full Flask config mixes in unrelated keys
+    celery.conf.update(
+        task_always_eager=Config.CELERY_TASK_ALWAYS_EAGER,
     )
-    celery.conf.update(app.config)
     class ContextTask(celery.Task):
         def __call__(self, *args, **kwargs):
-            with app.app_context():
+            # eager tasks called from a request reuse the caller's app
+            if has_app_context():
+                return self.run(*args, **kwargs)
+            with flask_app().app_context():
                 return self.run(*args, **kwargs)
     celery.Task = ContextTask
     return celery
 
-from app import create_app
-flask_app = create_app()
-celery = make_celery(flask_app)
+celery = make_celery()
 from celery.schedules import crontab
 
 # Configure beat schedule to run weekly stats every Monday at midnight
@@ -26,26 +41,106 @@ celery.conf.beat_schedule = {
         'task': 'app.tasks.background_tasks.generate_weekly_stats',
         'schedule': crontab(day_of_week='mon', hour=0, minute=0),
     },
+    'rotate-event-collections': {
+        'task': 'app.tasks.background_tasks.rotate_event_collections',
+        'schedule': crontab(hour=1, minute=0),
+    },
+    'maintain-consumption-partitions': {
+        'task': 'app.tasks.background_tasks.maintain_consumption_partitions',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'expire-exports': {
+        'task': 'app.tasks.background_tasks.expire_exports',
+        'schedule': crontab(hour=3, minute=0),
+    },
 }
 
 @celery.task
-async def generate_weekly_stats():
-    # This would aggregate consumption stats weekly
-    print("Generating weekly stats...")
-    # Future: write to DB or send emails
-    return True
+def generate_weekly_stats(week_start=None, chunk_size=None):
+    """
+    Builds last week's WeeklyReport rows. Users are partitioned into id ranges and
+    each range is computed by its own compute_weekly_report_chunk task, in parallel.
+    Returns the number of chunks dispatched.
+    """
+    from app.services.report_service import last_week_start, user_id_ranges
+    week_start = week_start or last_week_start().isoformat()
+    chunk_size = chunk_size or current_app.config.get('WEEKLY_REPORT_CHUNK_SIZE', 1000)
+    ranges = user_id_ranges(chunk_size)
+    if ranges:
+        group(compute_weekly_report_chunk.s(first, last, week_start) for first, last in ranges).apply_async()
+    return len(ranges)
+
+@celery.task
+def compute_weekly_report_chunk(first_user_id, last_user_id, week_start):
+    """Compute and store the weekly reports of one user id range."""
+    from app.services.report_service import compute_weekly_reports
+    return compute_weekly_reports(first_user_id, last_user_id, date.fromisoformat(week_start))
+
+@celery.task
+def export_consumption(user_id, export_id, fmt='csv', start=None, end=None):
+    """
+    Writes a user's consumption export to EXPORT_DIR/<user_id>/<export_id>.<fmt>.
+    start/end are optional ISO timestamps (UTC). Returns the number of rows written.
+    A failure is recorded so GET /consumption/export/<export_id> stops answering 'pending'.
+    """
+    from app.services.export_service import EXPORT_FAILED, export_path, set_export_status, write_export
+    export_dir = current_app.config['EXPORT_DIR']
+    try:
+        return write_export(
+            user_id, export_path(export_dir, user_id, export_id, fmt), fmt,
+            start=datetime.fromisoformat(start) if start else None,
+            end=datetime.fromisoformat(end) if end else None,
+            chunk_size=current_app.config.get('EXPORT_CHUNK_SIZE', 1000),
+        )
+    except Exception:
+        set_export_status(export_dir, user_id, export_id, EXPORT_FAILED)
+        raise
+
+@celery.task
+def rebuild_user_rollups(user_id):
+    """Re-bucket one user's daily rollup, e.g. after a timezone change."""
+    from app.services.cache_service import response_cache
+    from app.services.rollup_service import rebuild_rollups
+    written = rebuild_rollups(user_id)
+    # responses cached while the old buckets were still in place
+    response_cache.invalidate_user(user_id)
+    return written
+
+@celery.task
+def expire_exports():
+    """Delete background exports older than EXPORT_RETENTION_HOURS."""
+    from app.services.export_service import expire_exports as expire
+    config = current_app.config
+    return expire(config['EXPORT_DIR'], config['EXPORT_RETENTION_HOURS'] * 3600)
+
+@celery.task
+def rotate_event_collections():
+    """Prepare upcoming event collections and drop expired monthly ones."""
+    from app.services.mongo_service import mongo_service
+    return mongo_service.rotate()
+
+@celery.task
+def maintain_consumption_partitions():
+    """Create upcoming consumption partitions, purge old debug rows and archive cold months."""
+    from app.services.partition_service import run_maintenance
+    config = current_app.config
+    return run_maintenance(
+        months_ahead=config['CONSUMPTION_PARTITIONS_AHEAD'],
+        archive_after_months=config['CONSUMPTION_ARCHIVE_AFTER_MONTHS'],
+        debug_retention_days=config['CONSUMPTION_DEBUG_RETENTION_DAYS'],
+    )
 
 @celery.task
-async def send_reminder_email(user_email: str, subject: str, body: str):
+def send_reminder_email(user_email: str, subject: str, body: str):
     """Send a reminder email to a user (placeholder implementation)."""
     # TODO: Replace with real SMTP/mail service integration
     print(f"Sending reminder email to {user_email}: {subject}\n{body}")
     return True
 
 @celery.task
-async def send_milestone_email(user_email: str, milestone: str):
+def send_milestone_email(user_email: str, milestone: str):
     """Notify user upon reaching a milestone."""
     subject = f"Congratulations on your {milestone}!"
     body = f"You've reached {milestone} in your journey. Keep up the great work!"
-    await send_reminder_email(user_email, subject, body)
+    send_reminder_email.delay(user_email, subject, body)
     return True
@@ -0,0 +1,78 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Run any benchmark from the Server directory, e.g. ``python -m benchmarks.event_sink``.
+Results are printed as a single JSON document so runs can be diffed across commits.
+"""
+import json
+import statistics
+import sys
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.models.user import User  # noqa: F401
+from app.models.consumption import Consumption  # noqa: F401
+from app.models.daily_rollup import DailyConsumptionRollup  # noqa: F401
+from app.models.weekly_report import WeeklyReport  # noqa: F401
+
+
+def make_app(**config):
+    settings = {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'JWT_SECRET_KEY': 'bench-secret-key',
+        'MONGO_URI': None,
+        'TOKEN_REVOCATION_BACKEND': 'memory',
+        'TESTING': True,
+    }
+    settings.update(config)
+    app = create_app(settings)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {'count': 0}
+
+    def pick(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'p50_ms': round(pick(50), 3),
+        'p95_ms': round(pick(95), 3),
+        'p99_ms': round(pick(99), 3),
+        'max_ms': round(ordered[-1], 3),
+    }
+
+
+def emit(result):
+    json.dump(result, sys.stdout, indent=2, sort_keys=True, default=str)
+    sys.stdout.write('\n')
+
+
+@contextmanager
+def counting_statements(engine):
+    """
+    Counts SQL statements sent through `engine` inside the block:
+
+        with counting_statements(db.engine) as counter:
+            ...
+        counter['statements']
+    """
+    counter = {'statements': 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter['statements'] += 1
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
@@ -0,0 +1,108 @@
+"""
+Throughput at high client concurrency in each SERVING_MODE, with injected
+database latency. Seeds a temporary SQLite database, starts one gunicorn worker
+per mode on benchmarks.latency_app and drives read endpoints over HTTP.
+
+    python -m benchmarks.concurrency --db-latency-ms 20 --concurrency 200 --requests 2000
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.services.serving_service import SERVING_MODES
+from benchmarks.common import make_app, emit
+from benchmarks.load import HttpDriver, login_tokens, run_load
+from benchmarks.seed import PASSWORD, seed, user_email
+
+# read-only mix: SQLite serializes writers, which would measure the database instead
+SCENARIO = (
+    (5, 'user.profile', 'GET', '/user/profile', None),
+    (10, 'consumption.today', 'GET', '/consumption/today', None),
+    (10, 'consumption.weekly', 'GET', '/consumption/weekly', None),
+    (5, 'consumption.history', 'GET', '/consumption/history?limit=50', None),
+    (15, 'stats.today', 'GET', '/stats/today', None),
+    (15, 'stats.weekly', 'GET', '/stats/weekly', None),
+)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(driver, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'gunicorn exited with {process.returncode}')
+        try:
+            if driver.request('GET', '/health')[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit('gunicorn did not become ready')
+
+
+def _serve(mode, env, args):
+    port = _free_port()
+    env = dict(env, SERVING_MODE=mode, GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_WORKERS='1',
+               GUNICORN_THREADS=str(args.threads), GUNICORN_WORKER_CONNECTIONS=str(args.worker_connections),
+               GUNICORN_ACCESSLOG='/dev/null', BENCH_DB_LATENCY_MS=str(args.db_latency_ms))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'benchmarks.latency_app:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return process, HttpDriver(f'http://127.0.0.1:{port}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modes', default=','.join(SERVING_MODES))
+    parser.add_argument('--db-latency-ms', type=float, default=20)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=4, help='gthread threads per worker (sync mode)')
+    parser.add_argument('--worker-connections', type=int, default=1000, help='greenlets per worker (gevent mode)')
+    args = parser.parse_args()
+
+    uri = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='iquit-concurrency-'), 'api.db')
+    # cheap hashes: logins are setup here, not what is being measured
+    app = make_app(SQLALCHEMY_DATABASE_URI=uri, PASSWORD_HASH_COST=4)
+    with app.app_context():
+        seeded = seed(args.users, args.days, 3)
+    env = dict(os.environ, DATABASE_URI=uri, MONGO_URI='', JWT_SECRET_KEY='bench-secret-key', CACHE_BACKEND='none',
+               TOKEN_REVOCATION_BACKEND='memory')
+    emails = [user_email(seeded['first_user_id'] + i) for i in range(min(20, args.users))]
+
+    results = {}
+    for mode in args.modes.split(','):
+        process, driver = _serve(mode, env, args)
+        try:
+            _wait_ready(driver, process)
+            tokens = login_tokens(driver, emails, PASSWORD)
+            report = run_load(driver, tokens, PASSWORD, args.requests, args.concurrency, scenario=SCENARIO)
+            results[mode] = report['overall']
+        finally:
+            process.terminate()
+            process.wait(10)
+    report = {
+        'benchmark': 'concurrency',
+        'parameters': vars(args),
+        'modes': results,
+    }
+    if 'sync' in results and 'gevent' in results and results['sync']['throughput_rps']:
+        report['gevent_vs_sync'] = round(results['gevent']['throughput_rps'] / results['sync']['throughput_rps'], 2)
+    emit(report)
+    return 1 if any(r['errors'] for r in results.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
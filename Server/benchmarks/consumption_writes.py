@@ -0,0 +1,84 @@
+"""
+Writes per second for a single consumption entry on SQLite: the previous ORM
+path (add, commit, reload for the id) vs. the Core insert used by
+POST /consumption, plus the endpoint itself with a warm current_user cache.
+
+    python -m benchmarks.consumption_writes --writes 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from app.extensions import db
+from app.models.user import User
+from app.models.consumption import Consumption
+from app.services.consumption_service import insert_consumption, parse_consumption
+from app.services.rollup_service import record_consumptions
+from app.services.user_cache import CachedUser
+from app.services.token_service import issue_tokens
+from benchmarks.common import make_app, counting_statements, emit
+
+PAYLOAD = {'substance_type': 'cigarette', 'quantity': 1, 'unit': 'unit', 'cost': 0.6}
+
+
+def orm_insert(user, values, is_debug=False):
+    """The write path POST /consumption used before the Core insert."""
+    entry = Consumption(user_id=user.id, is_debug=is_debug, **values)
+    db.session.add(entry)
+    record_consumptions([entry], user.timezone)
+    db.session.commit()
+    return entry.id
+
+
+def _measure(writes, write_one, engine):
+    with counting_statements(engine) as counter:
+        started = time.perf_counter()
+        for _ in range(writes):
+            write_one()
+        elapsed = time.perf_counter() - started
+    return {
+        'writes': writes,
+        'writes_per_second': round(writes / elapsed, 1),
+        'mean_ms': round(elapsed / writes * 1000, 3),
+        'statements_per_write': round(counter['statements'] / writes, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writes', type=int, default=2000)
+    args = parser.parse_args()
+    path = os.path.join(tempfile.mkdtemp(prefix='iquit-bench-'), 'writes.db')
+    app = make_app(SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}')
+    results = {}
+    with app.app_context():
+        user = User(email='writes@iquit.dev', username='writes')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        cached = CachedUser(user.id, user.email, user.created_at, user.timezone)
+        token = issue_tokens(user)['token']
+        engine = db.engine
+
+        def values():
+            return parse_consumption(dict(PAYLOAD, timestamp=datetime.utcnow().isoformat()))
+
+        results['orm'] = _measure(args.writes, lambda: orm_insert(cached, values()), engine)
+        results['core'] = _measure(args.writes, lambda: insert_consumption(cached, values()), engine)
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/consumption', json=PAYLOAD, headers=headers)  # warm the current_user cache
+    results['endpoint'] = _measure(
+        args.writes, lambda: client.post('/consumption', json=PAYLOAD, headers=headers).close(), engine
+    )
+    results['speedup_core_vs_orm'] = round(
+        results['core']['writes_per_second'] / results['orm']['writes_per_second'], 2
+    )
+    emit({'benchmark': 'consumption_writes', 'database': 'sqlite', 'results': results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Request latency with a slow MongoDB, synchronous insert_one vs. the buffered event sink.
+
+    python -m benchmarks.event_sink --requests 200 --mongo-latency-ms 20
+"""
+import argparse
+import time
+
+from app.services.mongo_service import mongo_service
+from benchmarks.common import make_app, percentiles, emit
+
+
+class SlowCollection:
+    """Stand-in for a pymongo collection where every round trip costs ``latency`` seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.documents = 0
+
+    def insert_one(self, document):
+        time.sleep(self.latency)
+        self.documents += 1
+
+    def insert_many(self, documents, ordered=True):
+        time.sleep(self.latency)
+        self.documents += len(documents)
+
+    def create_index(self, keys, **kwargs):
+        time.sleep(self.latency)
+
+
+class SlowDatabase(dict):
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+
+    def __missing__(self, name):
+        self[name] = SlowCollection(self.latency)
+        return self[name]
+
+
+def run(buffered, requests, latency):
+    app = make_app(MONGO_EVENT_BUFFERED=buffered)
+    mongo_service.db = SlowDatabase(latency)
+    client = app.test_client()
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        # logs one event and returns 400 before touching SQL
+        client.post('/auth/login', json={})
+        samples.append((time.perf_counter() - start) * 1000)
+    mongo_service.flush()
+    result = percentiles(samples)
+    result['events_written'] = mongo_service.db['events'].documents
+    result['sink'] = mongo_service.stats()
+    mongo_service.shutdown()
+    mongo_service.db = None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--mongo-latency-ms', type=float, default=20.0)
+    args = parser.parse_args()
+    latency = args.mongo_latency_ms / 1000.0
+    emit({
+        'benchmark': 'event_sink',
+        'mongo_latency_ms': args.mongo_latency_ms,
+        'synchronous': run(False, args.requests, latency),
+        'buffered': run(True, args.requests, latency),
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Peak Python memory while streaming a user's full history (NDJSON history, CSV
+export response, CSV export file), for growing history sizes. With server-side
+cursors and yield_per the peak should stay flat.
+
+    python -m benchmarks.history_stream --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models.user import User
+from app.models.consumption import Consumption
+from app.services.export_service import write_export
+from app.services.token_service import issue_tokens
+from benchmarks.common import make_app, emit
+
+
+def _seed(app, rows):
+    with app.app_context():
+        user = User(email=f'history{rows}@iquit.dev', username=f'history{rows}')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        start = datetime.utcnow() - timedelta(minutes=rows)
+        db.session.execute(Consumption.__table__.insert(), [
+            {'user_id': user.id, 'timestamp': start + timedelta(minutes=i), 'substance_type': 'cigarette',
+             'quantity': 1.0, 'unit': 'unit', 'cost': 0.5, 'notes': None, 'is_debug': False}
+            for i in range(rows)
+        ])
+        db.session.commit()
+        return user.id, issue_tokens(user)['token']
+
+
+def _stream(client, token, url):
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(url, headers={'Authorization': f'Bearer {token}'}, buffered=False)
+    lines = 0
+    size = 0
+    for chunk in response.response:
+        lines += chunk.count(b'\n') if isinstance(chunk, bytes) else chunk.count('\n')
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    response.close()
+    return {'lines': lines, 'bytes': size, 'seconds': round(elapsed, 3), 'peak_kib': round(peak / 1024, 1)}
+
+
+def _export_file(app, user_id, directory):
+    with app.app_context():
+        tracemalloc.start()
+        started = time.perf_counter()
+        written = write_export(user_id, os.path.join(directory, 'export.csv'), 'csv')
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {'lines': written, 'bytes': os.path.getsize(os.path.join(directory, 'export.csv')),
+            'seconds': round(elapsed, 3), 'peak_kib': round(peak / 1024, 1)}
+
+
+def run(rows):
+    directory = tempfile.mkdtemp(prefix='iquit-bench-')
+    app = make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(directory, 'history.db')}")
+    user_id, token = _seed(app, rows)
+    client = app.test_client()
+    return {
+        'rows': rows,
+        'history_ndjson': _stream(client, token, '/consumption/history?format=ndjson'),
+        'export_csv': _stream(client, token, '/consumption/export'),
+        'export_file_csv': _export_file(app, user_id, directory),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+    emit({'benchmark': 'history_stream', 'runs': [run(rows) for rows in args.sizes]})
+
+
+if __name__ == '__main__':
+    main()
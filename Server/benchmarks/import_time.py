@@ -0,0 +1,70 @@
+"""
+Cold-start import profile of the web app and the Celery worker, measured with
+``python -X importtime`` in fresh interpreters. tests/test_import_time.py holds
+each target to its time budget and checks that lazily loaded modules stay out.
+
+    python -m benchmarks.import_time
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from benchmarks.common import emit
+
+_ENV = {
+    'DATABASE_URI': 'sqlite://',
+    'MONGO_URI': '',
+    'CELERY_BROKER_URL': 'memory://',
+    'CELERY_RESULT_BACKEND': 'cache+memory://',
+}
+
+# name: code run in a fresh interpreter
+TARGETS = {
+    'web': 'from app import create_app; create_app()',
+    'worker': 'import app.tasks.background_tasks',
+    'worker_app': 'from app.tasks.background_tasks import flask_app; flask_app()',
+}
+
+
+def profile(code):
+    """
+    Returns ({module: cumulative_us}, total_us) for one cold import of `code`.
+    """
+    env = dict(os.environ, **_ENV)
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env,
+                               capture_output=True, text=True, check=True)
+    modules = {}
+    total = 0
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # import time:  <self us> | <cumulative us> | <indented module name>
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative_us)
+        total += int(self_us)
+    return modules, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--runs', type=int, default=3, help='best of N cold starts')
+    args = parser.parse_args()
+    results = []
+    for name, code in TARGETS.items():
+        runs = [profile(code) for _ in range(args.runs)]
+        modules, total_us = min(runs, key=lambda run: run[1])
+        top_level = {module: us for module, us in modules.items() if '.' not in module}
+        heaviest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        results.append({
+            'target': name,
+            'import_ms': round(total_us / 1000, 1),
+            'modules': len(modules),
+            'heaviest_ms': {module: round(us / 1000, 1) for module, us in heaviest},
+        })
+    emit({'benchmark': 'import_time', 'results': results})
+
+
+if __name__ == '__main__':
+    main()
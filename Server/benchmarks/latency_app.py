@@ -0,0 +1,26 @@
+"""
+WSGI entry point for benchmarks.concurrency: the regular app, with every SQL
+statement delayed by BENCH_DB_LATENCY_MS to stand in for a remote database.
+The delay is a plain time.sleep, which gevent makes cooperative like a socket wait.
+
+    BENCH_DB_LATENCY_MS=20 gunicorn -c gunicorn.conf.py benchmarks.latency_app:app
+"""
+import os
+import time
+
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+
+LATENCY = float(os.getenv('BENCH_DB_LATENCY_MS', '20')) / 1000.0
+
+app = create_app()
+
+
+def _delay(conn, cursor, statement, parameters, context, executemany):
+    time.sleep(LATENCY)
+
+
+with app.app_context():
+    event.listen(db.engine, 'before_cursor_execute', _delay)
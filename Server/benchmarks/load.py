@@ -0,0 +1,146 @@
+"""
+Drives the API at a fixed concurrency, either in-process through the Flask test
+client or over HTTP against a running server (e.g. a local gunicorn).
+"""
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.common import percentiles
+
+# (weight, name, method, path, body) -- one entry per endpoint, touching every blueprint
+SCENARIO = (
+    (2, 'auth.login', 'POST', '/auth/login', 'login'),
+    (5, 'user.profile', 'GET', '/user/profile', None),
+    (10, 'consumption.log', 'POST', '/consumption', 'entry'),
+    (10, 'consumption.today', 'GET', '/consumption/today', None),
+    (10, 'consumption.weekly', 'GET', '/consumption/weekly', None),
+    (5, 'consumption.history', 'GET', '/consumption/history?limit=50', None),
+    (15, 'stats.today', 'GET', '/stats/today', None),
+    (15, 'stats.weekly', 'GET', '/stats/weekly', None),
+)
+
+_METRIC_LINE = re.compile(r'^iquit_sql_statements_per_request_(sum|count)\{method="([^"]+)",endpoint="([^"]+)"\} (\S+)$')
+
+
+def _body(kind, email, password):
+    if kind == 'login':
+        return {'email': email, 'password': password}
+    if kind == 'entry':
+        return {'substance_type': 'cigarette', 'quantity': 1, 'unit': 'unit', 'cost': 0.6,
+                'timestamp': datetime.utcnow().isoformat()}
+    return None
+
+
+class InProcessDriver:
+    """Sends requests through a Flask test client (one per thread)."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, token=None, body=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = client.open(path, method=method, headers=headers, json=body)
+        return response.status_code, response.get_data()
+
+
+class HttpDriver:
+    """Sends requests to a running server."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, token=None, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            req.add_header('Content-Type', 'application/json')
+        if token:
+            req.add_header('Authorization', f'Bearer {token}')
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+def statement_counts(driver):
+    """
+    Reads (sum, count) of SQL statements per endpoint from /metrics.
+    """
+    status, body = driver.request('GET', '/metrics')
+    counts = defaultdict(lambda: [0.0, 0.0])
+    if status != 200:
+        return counts
+    for line in body.decode('utf-8').splitlines():
+        match = _METRIC_LINE.match(line)
+        if match:
+            field, method, endpoint, value = match.groups()
+            counts[(method, endpoint)][0 if field == 'sum' else 1] = float(value)
+    return counts
+
+
+def login_tokens(driver, emails, password):
+    tokens = []
+    for email in emails:
+        status, body = driver.request('POST', '/auth/login', body={'email': email, 'password': password})
+        if status == 200:
+            tokens.append((email, json.loads(body)['token']))
+    return tokens
+
+
+def run_load(driver, tokens, password, requests, concurrency, scenario=SCENARIO, seed_value=7):
+    """
+    Issues `requests` requests drawn from `scenario` with `concurrency` threads.
+    Returns per-endpoint latency percentiles, throughput and SQL statements per request.
+    """
+    rng = random.Random(seed_value)
+    weights = [weight for weight, *_ in scenario]
+    plan = [(rng.choices(scenario, weights)[0], rng.choice(tokens)) for _ in range(requests)]
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def issue(item):
+        (_, name, method, path, kind), (email, token) = item
+        body = _body(kind, email, password)
+        started = time.perf_counter()
+        status, _ = driver.request(method, path, token=None if kind == 'login' else token, body=body)
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            samples[name].append(elapsed)
+            if status >= 400:
+                errors[name] += 1
+
+    before = statement_counts(driver)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(issue, plan))
+    elapsed = time.perf_counter() - started
+    after = statement_counts(driver)
+
+    endpoints = {}
+    for _, name, method, path, _ in scenario:
+        rule = path.split('?', 1)[0]
+        statements, counted = (after[(method, rule)][i] - before[(method, rule)][i] for i in (0, 1))
+        result = percentiles(samples[name])
+        result['errors'] = errors[name]
+        result['throughput_rps'] = round(len(samples[name]) / elapsed, 2)
+        result['queries_per_request'] = round(statements / counted, 2) if counted else None
+        endpoints[name] = result
+    overall = percentiles([ms for values in samples.values() for ms in values])
+    overall['throughput_rps'] = round(requests / elapsed, 2)
+    overall['errors'] = sum(errors.values())
+    overall['seconds'] = round(elapsed, 3)
+    return {'overall': overall, 'endpoints': endpoints}
@@ -0,0 +1,81 @@
+"""
+Login throughput against hashing pool size, and how a login storm affects a cheap
+endpoint served by the same process.
+
+    python -m benchmarks.password_hashing --logins 64 --concurrency 8 --workers 0 1 2 4
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.extensions import db
+from app.models.user import User
+from app.services.password_service import password_hasher
+from benchmarks.common import make_app, percentiles, emit
+
+
+def run(hash_workers, logins, concurrency, algorithm, cost):
+    app = make_app(PASSWORD_HASH_WORKERS=hash_workers, PASSWORD_HASH_ALGORITHM=algorithm,
+                   PASSWORD_HASH_COST=cost, PASSWORD_HASH_MAX_PENDING=max(concurrency, 1))
+    with app.app_context():
+        user = User(email='hash@iquit.dev', username='hash')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+
+    def login(_):
+        client = app.test_client()
+        started = time.perf_counter()
+        status = client.post('/auth/login', json={'email': 'hash@iquit.dev', 'password': 'password123'}).status_code
+        return status, (time.perf_counter() - started) * 1000
+
+    probe_samples = []
+    storm_running = threading.Event()
+    storm_running.set()
+
+    def probe():
+        client = app.test_client()
+        while storm_running.is_set():
+            started = time.perf_counter()
+            client.get('/health')
+            probe_samples.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.005)
+
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    storm_running.clear()
+    prober.join()
+    password_hasher.shutdown()
+    return {
+        'hash_workers': hash_workers,
+        'logins_per_second': round(logins / elapsed, 2),
+        'ok': sum(status == 200 for status, _ in results),
+        'busy': sum(status == 503 for status, _ in results),
+        'login': percentiles([ms for _, ms in results]),
+        'health_during_storm': percentiles(probe_samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4])
+    parser.add_argument('--algorithm', default='bcrypt')
+    parser.add_argument('--cost', type=int, default=None)
+    args = parser.parse_args()
+    emit({
+        'benchmark': 'password_hashing',
+        'algorithm': args.algorithm,
+        'concurrency': args.concurrency,
+        'runs': [run(w, args.logins, args.concurrency, args.algorithm, args.cost) for w in args.workers],
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Query plans and timings of the Consumption read paths on SQLite.
+
+Runs each read path, captures the SQL it issues, and EXPLAINs and times every
+statement that touches the consumption table. tests/test_query_plans.py fails
+when one of them scans the table instead of searching an index.
+
+    python -m benchmarks.query_plans
+"""
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, false
+
+from app.extensions import db
+from app.models.user import User
+from app.models.consumption import Consumption
+from app.services.aggregation_service import raw_daily_totals
+from app.services.consumption_service import get_today_consumptions
+from app.services.token_service import issue_tokens
+from benchmarks.common import make_app, emit
+
+ENDPOINTS = ['/consumption/today', '/consumption/weekly', '/stats/today', '/stats/weekly']
+
+
+def _seed():
+    user = User(email='plans@iquit.dev', username='plans')
+    user.set_password('password123')
+    db.session.add(user)
+    db.session.commit()
+    now = datetime.utcnow()
+    db.session.add_all([
+        Consumption(user_id=user.id, timestamp=now - timedelta(hours=i), substance_type='cigarette',
+                    quantity=1, unit='unit', cost=0.5)
+        for i in range(48)
+    ])
+    db.session.commit()
+    return user
+
+
+def _capture(engine, statements):
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'consumption' in statement and statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    return before_cursor_execute
+
+
+def main():
+    app = make_app()
+    statements = []
+    with app.app_context():
+        user = _seed()
+        token = issue_tokens(user)['token']
+        listener = _capture(db.engine, statements)
+        get_today_consumptions(user)
+        raw_daily_totals(user.id, 7)
+        Consumption.query.filter(
+            Consumption.user_id == user.id,
+            Consumption.is_debug == false(),
+            Consumption.timestamp >= datetime.utcnow() - timedelta(days=7)
+        ).all()
+        client = app.test_client()
+        for path in ENDPOINTS:
+            client.get(path, headers={'Authorization': f'Bearer {token}'})
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+        plans = []
+        connection = db.session.connection()
+        for statement, parameters in statements:
+            rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, tuple(parameters))
+            detail = [row[-1] for row in rows]
+            started = time.perf_counter()
+            connection.exec_driver_sql(statement, tuple(parameters)).fetchall()
+            plans.append({'sql': ' '.join(statement.split()), 'plan': detail,
+                          'ms': round((time.perf_counter() - started) * 1000, 3)})
+    emit({'benchmark': 'query_plans', 'statements': len(plans), 'plans': plans})
+
+
+if __name__ == '__main__':
+    main()
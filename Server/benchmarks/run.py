@@ -0,0 +1,81 @@
+"""
+End-to-end API benchmark: seeds a database, drives every blueprint at a target
+concurrency and writes a JSON report that can be compared across commits.
+
+In-process (Flask test client, temporary SQLite database):
+
+    python -m benchmarks.run --users 200 --days 30 --requests 2000 --concurrency 8 --output before.json
+
+Against a running server whose database was seeded with benchmarks.seed:
+
+    python -m benchmarks.run --url http://localhost:5002 --first-user-id 1 --requests 5000 --concurrency 32
+"""
+import argparse
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.common import make_app, emit
+from benchmarks.load import InProcessDriver, HttpDriver, login_tokens, run_load
+from benchmarks.seed import PASSWORD, seed, user_email
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='benchmark a running server instead of an in-process app')
+    parser.add_argument('--database-uri', help='in-process database (defaults to a temporary SQLite file)')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--per-day', type=int, default=5)
+    parser.add_argument('--first-user-id', type=int, default=1, help='first seeded user id (--url mode)')
+    parser.add_argument('--token-users', type=int, default=20, help='distinct users issuing requests')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--output', help='also write the report to this file')
+    args = parser.parse_args()
+
+    report = {
+        'benchmark': 'api',
+        'revision': _git_revision(),
+        'started_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'parameters': {key: value for key, value in vars(args).items() if key != 'output'},
+    }
+    if args.url:
+        driver = HttpDriver(args.url)
+        first_user_id = args.first_user_id
+    else:
+        uri = args.database_uri or 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='iquit-bench-'), 'api.db')
+        app = make_app(SQLALCHEMY_DATABASE_URI=uri)
+        with app.app_context():
+            started = time.perf_counter()
+            report['seed'] = seed(args.users, args.days, args.per_day)
+            report['seed']['seconds'] = round(time.perf_counter() - started, 3)
+        driver = InProcessDriver(app)
+        first_user_id = report['seed']['first_user_id']
+
+    emails = [user_email(first_user_id + i) for i in range(min(args.token_users, args.users))]
+    tokens = login_tokens(driver, emails, PASSWORD)
+    if not tokens:
+        raise SystemExit('Could not log in any benchmark user; seed the database first.')
+    report.update(run_load(driver, tokens, PASSWORD, args.requests, args.concurrency))
+    emit(report)
+    if args.output:
+        import json
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True, default=str)
+
+
+if __name__ == '__main__':
+    main()
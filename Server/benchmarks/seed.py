@@ -0,0 +1,95 @@
+"""
+Seeds a database with synthetic users and consumption history using bulk inserts.
+
+    python -m benchmarks.seed --database-uri sqlite:////tmp/iquit-bench.db --users 1000 --days 90
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models.user import User
+from app.models.consumption import Consumption
+from app.services.password_service import password_hasher
+from app.services.rollup_service import rebuild_rollups
+from benchmarks.common import make_app, emit
+
+PASSWORD = 'password123'
+SUBSTANCES = (('cigarette', 'unit', 0.6), ('vape', 'puff', 0.05), ('alcohol', 'drink', 4.0))
+
+
+def user_email(index):
+    return f'bench{index}@iquit.dev'
+
+
+def seed(users, days, per_day, batch_size=10000, seed_value=42):
+    """
+    Inserts `users` users, each with about `per_day` entries per day over the last
+    `days` days, then rebuilds the daily rollup. Must run inside an app context.
+    Returns row counts.
+    """
+    rng = random.Random(seed_value)
+    # every synthetic user shares one password, so hash it once
+    password_hash = password_hasher.hash(PASSWORD)
+    first_id = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    now = datetime.utcnow()
+    entries = 0
+    for offset in range(0, users, batch_size):
+        ids = range(first_id + offset, first_id + min(offset + batch_size, users))
+        db.session.execute(User.__table__.insert(), [
+            {'id': user_id, 'username': f'bench{user_id}', 'email': user_email(user_id),
+             'password_hash': password_hash, 'created_at': now - timedelta(days=days)}
+            for user_id in ids
+        ])
+        rows = []
+        for user_id in ids:
+            substance, unit, price = SUBSTANCES[user_id % len(SUBSTANCES)]
+            for day in range(days):
+                for _ in range(rng.randint(0, per_day * 2)):
+                    rows.append({
+                        'user_id': user_id,
+                        'timestamp': now - timedelta(days=day, seconds=rng.randint(0, 86399)),
+                        'substance_type': substance,
+                        'quantity': 1.0,
+                        'unit': unit,
+                        'cost': price,
+                        'notes': None,
+                        'is_debug': False,
+                    })
+                if len(rows) >= batch_size:
+                    db.session.execute(Consumption.__table__.insert(), rows)
+                    entries += len(rows)
+                    rows = []
+        if rows:
+            db.session.execute(Consumption.__table__.insert(), rows)
+            entries += len(rows)
+        db.session.commit()
+    if db.engine.dialect.name == 'postgresql':
+        # ids were assigned explicitly, move the sequence past them
+        table = db.engine.dialect.identifier_preparer.format_table(User.__table__)
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+        ))
+        db.session.commit()
+    rollups = rebuild_rollups()
+    return {'users': users, 'first_user_id': first_id, 'entries': entries, 'rollups': rollups}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-uri', required=True)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--per-day', type=int, default=5)
+    args = parser.parse_args()
+    app = make_app(SQLALCHEMY_DATABASE_URI=args.database_uri)
+    with app.app_context():
+        started = time.perf_counter()
+        counts = seed(args.users, args.days, args.per_day)
+    counts['seconds'] = round(time.perf_counter() - started, 3)
+    emit(dict(counts, benchmark='seed'))
+
+
+if __name__ == '__main__':
+    main()
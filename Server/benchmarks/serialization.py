@@ -0,0 +1,142 @@
+"""
+JSON encoding CPU and bytes on the wire for large history payloads. First the
+entry serializer alone (the old isoformat() + json.dumps path against both
+json_service encoders), then GET /consumption/history (one JSON page and the full
+NDJSON stream) per JSON_PROVIDER and Accept-Encoding. Exits non-zero when an
+encoder or encoding changes the decoded payload.
+
+    python -m benchmarks.serialization --rows 20000
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models.user import User
+from app.models.consumption import Consumption
+from app.services import compression_service
+from app.services.consumption_service import CONSUMPTION_COLUMNS, serialize_consumption
+from app.services.json_service import JSONEncoder, OrjsonEncoder, orjson
+from app.services.token_service import issue_tokens
+from benchmarks.common import make_app, emit
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DECODERS = {'identity': lambda body: body, 'gzip': gzip.decompress}
+if brotli is not None:
+    DECODERS['br'] = brotli.decompress
+
+
+def _seed(app, rows):
+    with app.app_context():
+        user = User(email=f'serialize{rows}@iquit.dev', username=f'serialize{rows}')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        start = datetime.utcnow() - timedelta(minutes=rows)
+        db.session.execute(Consumption.__table__.insert(), [
+            {'user_id': user.id, 'timestamp': start + timedelta(minutes=i, microseconds=i),
+             'substance_type': 'cigarette' if i % 3 else 'vape', 'quantity': 1.0, 'unit': 'unit',
+             'cost': 0.55, 'notes': 'after lunch' if i % 5 == 0 else None, 'is_debug': False}
+            for i in range(rows)
+        ])
+        db.session.commit()
+        return user.id, issue_tokens(user)['token']
+
+
+def _legacy_dumps(row):
+    entry = serialize_consumption(row)
+    entry['timestamp'] = entry['timestamp'].isoformat()
+    return json.dumps(entry).encode('utf-8')
+
+
+def _encoders(app, user_id, repeat):
+    with app.app_context():
+        rows = db.session.query(*CONSUMPTION_COLUMNS).filter(Consumption.user_id == user_id).all()
+    encoders = {'stdlib_isoformat': _legacy_dumps,
+                'json': lambda row: JSONEncoder.dumpb(serialize_consumption(row))}
+    if orjson is not None:
+        encoders['orjson'] = lambda row: OrjsonEncoder.dumpb(serialize_consumption(row))
+    results = {}
+    expected = None
+    for name, encode in encoders.items():
+        started = time.process_time()
+        for _ in range(repeat):
+            encoded = [encode(row) for row in rows]
+        cpu = (time.process_time() - started) / repeat
+        decoded = [json.loads(line) for line in encoded]
+        expected = expected if expected is not None else decoded
+        results[name] = {'cpu_ms': round(cpu * 1000, 2), 'us_per_row': round(cpu / len(rows) * 1e6, 3),
+                         'bytes': sum(map(len, encoded)), 'same_payload': decoded == expected}
+    return results
+
+
+def _fetch(client, token, url, encoding):
+    started = time.process_time()
+    response = client.get(url, headers={'Authorization': f'Bearer {token}', 'Accept-Encoding': encoding})
+    body = response.get_data()
+    cpu = time.process_time() - started
+    served = response.headers.get('Content-Encoding', 'identity')
+    return {'content_encoding': served, 'bytes': len(body), 'cpu_ms': round(cpu * 1000, 2)}, \
+        DECODERS[served](body)
+
+
+def _wire(database_uri, token, providers):
+    urls = {'history_page': '/consumption/history?limit=1000', 'history_ndjson': '/consumption/history?format=ndjson'}
+    results = {}
+    ok = True
+    for provider in providers:
+        client = make_app(SQLALCHEMY_DATABASE_URI=database_uri, JSON_PROVIDER=provider).test_client()
+        for label, url in urls.items():
+            parse = json.loads if label == 'history_page' else lambda body: [json.loads(l) for l in body.splitlines()]
+            reference = None
+            for encoding in DECODERS:
+                stats, body = _fetch(client, token, url, encoding)
+                payload = parse(body)
+                reference = reference if reference is not None else payload
+                stats['same_payload'] = payload == reference
+                ok = ok and stats['same_payload'] and stats['content_encoding'] == encoding
+                results.setdefault(provider, {}).setdefault(label, {})[encoding] = stats
+    return results, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='iquit-bench-')
+    database_uri = f"sqlite:///{os.path.join(directory, 'serialization.db')}"
+    app = make_app(SQLALCHEMY_DATABASE_URI=database_uri)
+    user_id, token = _seed(app, args.rows)
+
+    encoders = _encoders(app, user_id, args.repeat)
+    wire, wire_ok = _wire(database_uri, token, ['json'] + (['orjson'] if orjson is not None else []))
+    checks = {
+        'encoders_agree': all(result['same_payload'] for result in encoders.values()),
+        'encodings_roundtrip': wire_ok,
+    }
+    result = {
+        'benchmark': 'serialization',
+        'rows': args.rows,
+        'available_encodings': compression_service.available_encodings(),
+        'encoders': encoders,
+        'wire': wire,
+        'checks': checks,
+        'failures': sum(not ok for ok in checks.values()),
+    }
+    emit(result)
+    return 1 if result['failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+SQL statements and time per request for each authenticated endpoint, with a cold
+and a warm current_user cache. tests/test_statement_counts.py enforces the
+statement budgets.
+
+    python -m benchmarks.statement_counts
+"""
+import time
+
+from app.extensions import db, user_cache
+from app.models.user import User
+from app.services.token_service import issue_tokens
+from benchmarks.common import make_app, counting_statements, emit
+
+ENDPOINTS = [
+    ('GET', '/user/profile'),
+    ('GET', '/consumption/today'),
+    ('GET', '/consumption/weekly'),
+    ('GET', '/stats/today'),
+    ('GET', '/stats/weekly'),
+    ('GET', '/dashboard'),
+]
+
+
+def main():
+    app = make_app()
+    with app.app_context():
+        user = User(email='count@iquit.dev', username='count')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        token = issue_tokens(user)['token']
+        engine = db.engine
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+    results = []
+    for method, path in ENDPOINTS:
+        user_cache.clear()
+        result = {'endpoint': f'{method} {path}'}
+        for cache in ('cold', 'warm'):
+            started = time.perf_counter()
+            with counting_statements(engine) as counter:
+                client.open(path, method=method, headers=headers)
+            result[cache] = counter['statements']
+            result[f'{cache}_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        results.append(result)
+    emit({'benchmark': 'statement_counts', 'endpoints': results})
+
+
+if __name__ == '__main__':
+    main()
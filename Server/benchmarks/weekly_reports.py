@@ -0,0 +1,80 @@
+"""
+Weekly report job over a synthetic user base, on SQLite with Celery in eager mode.
+
+    python -m benchmarks.weekly_reports --users 100000 --chunk-sizes 1000 5000 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+# Celery and its worker app read Config from the environment, so configure it first
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix='iquit-bench-'), 'weekly.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{_DB_PATH}'
+os.environ['CELERY_TASK_ALWAYS_EAGER'] = 'true'
+os.environ.setdefault('CELERY_BROKER_URL', 'memory://')
+os.environ.setdefault('CELERY_RESULT_BACKEND', 'cache+memory://')
+
+from app.extensions import db  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.models.daily_rollup import DailyConsumptionRollup  # noqa: E402
+from app.models.weekly_report import WeeklyReport  # noqa: E402
+from app.services.report_service import last_week_start  # noqa: E402
+from app.tasks.background_tasks import flask_app, generate_weekly_stats  # noqa: E402
+from benchmarks.common import counting_statements, emit  # noqa: E402
+
+
+def seed(users, active_days, batch=20000):
+    week_start = last_week_start()
+    rng = random.Random(42)
+    db.drop_all()
+    db.create_all()
+    for offset in range(0, users, batch):
+        db.session.execute(User.__table__.insert(), [
+            {'id': i + 1, 'username': f'user{i}', 'email': f'user{i}@iquit.dev', 'password_hash': None}
+            for i in range(offset, min(offset + batch, users))
+        ])
+        rows = []
+        for i in range(offset, min(offset + batch, users)):
+            for day in rng.sample(range(7), active_days):
+                rows.append({'user_id': i + 1, 'day': week_start + timedelta(days=day),
+                             'substance_type': 'cigarette', 'count': rng.randint(1, 20),
+                             'quantity_sum': 1.0, 'cost_sum': 0.5})
+        db.session.execute(DailyConsumptionRollup.__table__.insert(), rows)
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--active-days', type=int, default=3)
+    parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    args = parser.parse_args()
+    runs = []
+    with flask_app().app_context():
+        started = time.perf_counter()
+        seed(args.users, args.active_days)
+        seed_seconds = time.perf_counter() - started
+        for chunk_size in args.chunk_sizes:
+            db.session.query(WeeklyReport).delete()
+            db.session.commit()
+            with counting_statements(db.engine) as counter:
+                started = time.perf_counter()
+                chunks = generate_weekly_stats.delay(chunk_size=chunk_size).get()
+                elapsed = time.perf_counter() - started
+            runs.append({
+                'chunk_size': chunk_size,
+                'chunks': chunks,
+                'reports': WeeklyReport.query.count(),
+                'seconds': round(elapsed, 3),
+                'users_per_second': round(args.users / elapsed, 1),
+                'statements': counter['statements'],
+            })
+    emit({'benchmark': 'weekly_reports', 'users': args.users, 'seed_seconds': round(seed_seconds, 3),
+          'runs': runs})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Gunicorn settings, picked up from the working directory or with `gunicorn -c gunicorn.conf.py`.
+Every value can be overridden through the environment.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5002")
+
+# SERVING_MODE=sync: gthread workers keep serving other requests while one waits on
+# Postgres or Mongo. Keep DB_POOL_SIZE + DB_MAX_OVERFLOW >= threads so threads don't
+# queue for connections.
+# SERVING_MODE=gevent: each worker multiplexes up to worker_connections requests on
+# greenlets; psycopg2 is made cooperative at startup (app.services.serving_service).
+# Requests beyond DB_POOL_SIZE + DB_MAX_OVERFLOW wait for a connection, so size the
+# pool for the concurrency you expect to reach the database.
+serving_mode = os.getenv("SERVING_MODE", "sync")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent" if serving_mode == "gevent" else "gthread")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# recycle workers now and then to bound slow leaks
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# the memory revocation list lives in one process: other workers would keep accepting
+# revoked tokens, and a recycled worker would forget every revocation
+if os.getenv("TOKEN_REVOCATION_BACKEND", "redis") == "memory":
+    if workers > 1:
+        raise RuntimeError("TOKEN_REVOCATION_BACKEND=memory needs GUNICORN_WORKERS=1; use redis with more workers")
+    max_requests = 0
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-")
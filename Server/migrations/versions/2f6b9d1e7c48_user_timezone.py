@@ -0,0 +1,27 @@
+"""add user.timezone
+
+Revision ID: 2f6b9d1e7c48
+Revises: 5d8f0a6c3e19
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f6b9d1e7c48'
+down_revision = '5d8f0a6c3e19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing users keep UTC, which is how their rollup days were bucketed
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.add_column(sa.Column('timezone', sa.String(length=64), server_default='UTC', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('timezone')
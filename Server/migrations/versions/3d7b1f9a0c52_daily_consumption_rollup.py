@@ -0,0 +1,40 @@
+"""add daily_consumption_rollup
+
+Revision ID: 3d7b1f9a0c52
+Revises: 4b0c6f1d2a7e
+Create Date: 2026-10-17 09:15:00.000000
+
+Databases built with db.create_all() after the rollup was introduced already have
+the table; it is only created when missing. Existing history is not summarized
+here (days depend on each user's timezone): run `flask rebuild-rollups` after
+upgrading a database that already holds consumption rows.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d7b1f9a0c52'
+down_revision = '4b0c6f1d2a7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('daily_consumption_rollup'):
+        return
+    op.create_table('daily_consumption_rollup',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('substance_type', sa.String(length=50), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('quantity_sum', sa.Float(), nullable=False),
+    sa.Column('cost_sum', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day', 'substance_type')
+    )
+
+
+def downgrade():
+    op.drop_table('daily_consumption_rollup')
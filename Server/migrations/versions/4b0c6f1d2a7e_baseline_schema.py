@@ -0,0 +1,51 @@
+"""baseline schema: user, consumption
+
+Revision ID: 4b0c6f1d2a7e
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+This is the schema as it stood before migrations were introduced. Databases
+created earlier with db.create_all() already have these tables; mark them as
+migrated with `flask db stamp 4b0c6f1d2a7e` before upgrading.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b0c6f1d2a7e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=80), nullable=False),
+    sa.Column('email', sa.String(length=120), nullable=False),
+    sa.Column('password_hash', sa.String(length=256), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_table('consumption',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('substance_type', sa.String(length=50), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=False),
+    sa.Column('unit', sa.String(length=20), nullable=False),
+    sa.Column('cost', sa.Float(), nullable=True),
+    sa.Column('notes', sa.String(length=255), nullable=True),
+    sa.Column('is_debug', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('consumption')
+    op.drop_table('user')
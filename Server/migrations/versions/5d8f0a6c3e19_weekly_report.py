@@ -0,0 +1,35 @@
+"""add weekly_report
+
+Revision ID: 5d8f0a6c3e19
+Revises: c7a1e5f04b23
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8f0a6c3e19'
+down_revision = 'c7a1e5f04b23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('weekly_report',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('week_start', sa.Date(), nullable=False),
+    sa.Column('total_count', sa.Integer(), nullable=False),
+    sa.Column('total_quantity', sa.Float(), nullable=False),
+    sa.Column('total_cost', sa.Float(), nullable=False),
+    sa.Column('average', sa.Float(), nullable=False),
+    sa.Column('daily_counts', sa.JSON(), nullable=False),
+    sa.Column('generated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'week_start')
+    )
+
+
+def downgrade():
+    op.drop_table('weekly_report')
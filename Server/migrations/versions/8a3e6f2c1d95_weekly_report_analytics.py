@@ -0,0 +1,36 @@
+"""add analytics columns to weekly_report
+
+Revision ID: 8a3e6f2c1d95
+Revises: 2f6b9d1e7c48
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3e6f2c1d95'
+down_revision = '2f6b9d1e7c48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('weekly_report') as batch_op:
+        batch_op.add_column(sa.Column('current_streak', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('longest_streak', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('rolling_7', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('rolling_30', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('trend_slope', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('money_saved', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('weekly_report') as batch_op:
+        batch_op.drop_column('money_saved')
+        batch_op.drop_column('trend_slope')
+        batch_op.drop_column('rolling_30')
+        batch_op.drop_column('rolling_7')
+        batch_op.drop_column('longest_streak')
+        batch_op.drop_column('current_streak')
@@ -0,0 +1,31 @@
+"""index consumption on (user_id, timestamp)
+
+Revision ID: 9e2d3c4b5a61
+Revises: 3d7b1f9a0c52
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e2d3c4b5a61'
+down_revision = '3d7b1f9a0c52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_consumption_user_id_timestamp', 'consumption', ['user_id', 'timestamp'], unique=False)
+    # partial index over real (non-debug) rows only
+    op.create_index(
+        'ix_consumption_live_user_id_timestamp', 'consumption', ['user_id', 'timestamp'], unique=False,
+        postgresql_where=sa.text('is_debug = false'),
+        sqlite_where=sa.text('is_debug = 0')
+    )
+
+
+def downgrade():
+    op.drop_index('ix_consumption_live_user_id_timestamp', table_name='consumption')
+    op.drop_index('ix_consumption_user_id_timestamp', table_name='consumption')
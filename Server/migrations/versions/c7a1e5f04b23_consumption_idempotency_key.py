@@ -0,0 +1,27 @@
+"""add consumption.idempotency_key for batch ingestion
+
+Revision ID: c7a1e5f04b23
+Revises: 9e2d3c4b5a61
+Create Date: 2026-10-17 10:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a1e5f04b23'
+down_revision = '9e2d3c4b5a61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('consumption', sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+    op.create_index('uq_consumption_user_id_idempotency_key', 'consumption', ['user_id', 'idempotency_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_consumption_user_id_idempotency_key', table_name='consumption')
+    with op.batch_alter_table('consumption') as batch_op:
+        batch_op.drop_column('idempotency_key')
@@ -0,0 +1,184 @@
+"""partition consumption by month on Postgres, add consumption_archive and consumption_idempotency_key
+
+Revision ID: e4c2a9b7f310
+Revises: 8a3e6f2c1d95
+Create Date: 2026-10-17 15:00:00.000000
+
+On Postgres the consumption table is rebuilt as a table range-partitioned by
+month on "timestamp", with a partition per month from the oldest row (at most
+PARTITION_MONTHS_BACK months back) through PARTITION_MONTHS_AHEAD months ahead
+and a default partition for anything else.
+Rows are copied, so plan for a maintenance window on large tables. SQLite keeps
+a plain table. Both get consumption_archive for months moved out of the live
+table (see app.services.partition_service), and consumption_idempotency_key,
+which enforces batch idempotency keys (a unique index on the partitioned table
+would have to include "timestamp") and keeps them once rows are archived.
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4c2a9b7f310'
+down_revision = '8a3e6f2c1d95'
+branch_labels = None
+depends_on = None
+
+PARTITION_MONTHS_AHEAD = 3
+# older rows (or bogus client timestamps) land in the default partition
+PARTITION_MONTHS_BACK = 36
+COLUMNS = 'id, user_id, "timestamp", substance_type, quantity, unit, cost, notes, is_debug, idempotency_key'
+ARCHIVE_COLUMNS = 'id, user_id, "timestamp", substance_type, quantity, unit, cost, notes'
+
+
+def _months(first, last):
+    month = first.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    while month <= last:
+        yield month
+        month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _create_indexes():
+    op.create_index('ix_consumption_user_id_timestamp', 'consumption', ['user_id', 'timestamp'], unique=False)
+    op.create_index(
+        'ix_consumption_live_user_id_timestamp', 'consumption', ['user_id', 'timestamp'], unique=False,
+        postgresql_where=sa.text('is_debug = false'),
+        sqlite_where=sa.text('is_debug = 0')
+    )
+
+
+def _drop_indexes():
+    for name in ('uq_consumption_user_id_idempotency_key', 'ix_consumption_live_user_id_timestamp',
+                 'ix_consumption_user_id_timestamp'):
+        op.drop_index(name, table_name='consumption')
+
+
+def _set_timestamp_nullable(nullable):
+    # SQLite cannot alter a column in place, so batch mode rebuilds the table. Indexes
+    # are dropped and recreated around it since reflection loses the partial index's WHERE.
+    with op.batch_alter_table('consumption', recreate='always') as batch_op:
+        batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=nullable)
+
+
+def upgrade():
+    bind = op.get_bind()
+    op.create_table('consumption_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('substance_type', sa.String(length=50), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=False),
+    sa.Column('unit', sa.String(length=20), nullable=False),
+    sa.Column('cost', sa.Float(), nullable=True),
+    sa.Column('notes', sa.String(length=255), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_consumption_archive_user_id_timestamp', 'consumption_archive', ['user_id', 'timestamp'],
+                    unique=False)
+    op.create_table('consumption_idempotency_key',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=64), nullable=False),
+    sa.Column('consumption_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'idempotency_key')
+    )
+    op.execute('INSERT INTO consumption_idempotency_key (user_id, idempotency_key, consumption_id) '
+               'SELECT user_id, idempotency_key, min(id) FROM consumption '
+               'WHERE idempotency_key IS NOT NULL GROUP BY user_id, idempotency_key')
+    # the partition key cannot be NULL; such rows were written "now" by the model default
+    bind.execute(sa.text('UPDATE consumption SET "timestamp" = :now WHERE "timestamp" IS NULL'),
+                 {'now': datetime.utcnow()})
+
+    if bind.dialect.name != 'postgresql':
+        _drop_indexes()
+        _set_timestamp_nullable(False)
+        _create_indexes()
+        op.create_index('uq_consumption_user_id_idempotency_key', 'consumption', ['user_id', 'idempotency_key'],
+                        unique=True)
+        return
+
+    op.execute('ALTER TABLE consumption RENAME TO consumption_unpartitioned')
+    op.execute('ALTER TABLE consumption_unpartitioned RENAME CONSTRAINT consumption_pkey TO consumption_unpartitioned_pkey')
+    for name in ('uq_consumption_user_id_idempotency_key', 'ix_consumption_live_user_id_timestamp',
+                 'ix_consumption_user_id_timestamp'):
+        op.execute(f'DROP INDEX {name}')
+    op.execute("""
+        CREATE TABLE consumption (
+            id INTEGER NOT NULL DEFAULT nextval('consumption_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES "user" (id),
+            "timestamp" TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            substance_type VARCHAR(50) NOT NULL,
+            quantity FLOAT NOT NULL,
+            unit VARCHAR(20) NOT NULL,
+            cost FLOAT,
+            notes VARCHAR(255),
+            is_debug BOOLEAN,
+            idempotency_key VARCHAR(64),
+            CONSTRAINT consumption_pkey PRIMARY KEY (id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+    """)
+    op.execute('CREATE TABLE consumption_default PARTITION OF consumption DEFAULT')
+    now = datetime.utcnow()
+    oldest = bind.execute(sa.text('SELECT min("timestamp") FROM consumption_unpartitioned')).scalar() or now
+    last = datetime(now.year + (now.month + PARTITION_MONTHS_AHEAD - 1) // 12,
+                    (now.month + PARTITION_MONTHS_AHEAD - 1) % 12 + 1, 1)
+    first = datetime(now.year - PARTITION_MONTHS_BACK // 12, now.month, 1)
+    for month in _months(min(max(oldest, first), now), last):
+        end = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+        op.execute(
+            f"CREATE TABLE consumption_{month:%Y_%m} PARTITION OF consumption "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+    op.execute(f'INSERT INTO consumption ({COLUMNS}) SELECT {COLUMNS} FROM consumption_unpartitioned')
+    # the sequence would be dropped with the old table otherwise
+    op.execute('ALTER SEQUENCE consumption_id_seq OWNED BY consumption.id')
+    op.execute('DROP TABLE consumption_unpartitioned')
+    _create_indexes()
+    # unique indexes on a partitioned table must include the partition key, so this one
+    # only serves lookups; consumption_idempotency_key enforces the keys
+    op.create_index('ix_consumption_user_id_idempotency_key', 'consumption', ['user_id', 'idempotency_key'],
+                    unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute('ALTER TABLE consumption RENAME TO consumption_partitioned')
+        op.execute('ALTER TABLE consumption_partitioned RENAME CONSTRAINT consumption_pkey TO consumption_partitioned_pkey')
+        for name in ('ix_consumption_user_id_idempotency_key', 'ix_consumption_live_user_id_timestamp',
+                     'ix_consumption_user_id_timestamp'):
+            op.execute(f'DROP INDEX {name}')
+        op.execute("""
+            CREATE TABLE consumption (
+                id INTEGER NOT NULL DEFAULT nextval('consumption_id_seq'),
+                user_id INTEGER NOT NULL REFERENCES "user" (id),
+                "timestamp" TIMESTAMP WITHOUT TIME ZONE,
+                substance_type VARCHAR(50) NOT NULL,
+                quantity FLOAT NOT NULL,
+                unit VARCHAR(20) NOT NULL,
+                cost FLOAT,
+                notes VARCHAR(255),
+                is_debug BOOLEAN,
+                idempotency_key VARCHAR(64),
+                CONSTRAINT consumption_pkey PRIMARY KEY (id)
+            )
+        """)
+        op.execute(f'INSERT INTO consumption ({COLUMNS}) SELECT {COLUMNS} FROM consumption_partitioned')
+        op.execute('ALTER SEQUENCE consumption_id_seq OWNED BY consumption.id')
+        # drops every partition with it
+        op.execute('DROP TABLE consumption_partitioned')
+        _create_indexes()
+    else:
+        _drop_indexes()
+        _set_timestamp_nullable(True)
+        _create_indexes()
+    # archived rows go back to the live table
+    op.execute(f'INSERT INTO consumption ({ARCHIVE_COLUMNS}, is_debug) '
+               f'SELECT {ARCHIVE_COLUMNS}, false FROM consumption_archive')
+    op.create_index('uq_consumption_user_id_idempotency_key', 'consumption', ['user_id', 'idempotency_key'],
+                    unique=True)
+    op.drop_table('consumption_idempotency_key')
+    op.drop_index('ix_consumption_archive_user_id_timestamp', table_name='consumption_archive')
+    op.drop_table('consumption_archive')
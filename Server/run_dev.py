@@ -15,6 +15,10 @@ if __name__ == '__main__':
     # Use SQLite for development instead of PostgreSQL
     os.environ['DATABASE_URI'] = 'sqlite:///iquit_dev.db'
     
+    # Single process, so the in-process response cache stays consistent
+    os.environ.setdefault('CACHE_BACKEND', 'memory')
+    os.environ.setdefault('TOKEN_REVOCATION_BACKEND', 'memory')
+
     # JWT secret key for development
     os.environ['JWT_SECRET_KEY'] = 'dev-secret-key'
     
@@ -24,6 +28,8 @@ if __name__ == '__main__':
     # Import models to ensure they're registered
     from app.models.user import User
     from app.models.consumption import Consumption
+    from app.models.daily_rollup import DailyConsumptionRollup
+    from app.models.weekly_report import WeeklyReport
     
     # Create tables if they don't exist
     with app.app_context():
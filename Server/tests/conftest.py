@@ -0,0 +1,41 @@
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models.user import User
+from app.models.consumption import Consumption  # noqa: F401
+from app.models.daily_rollup import DailyConsumptionRollup  # noqa: F401
+from app.models.weekly_report import WeeklyReport  # noqa: F401
+from app.services.token_service import issue_tokens
+
+
+@pytest.fixture
+def app():
+    """A web app on a fresh in-memory SQLite database; pytest-flask builds `client` from it."""
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'JWT_SECRET_KEY': 'test-secret-key-with-enough-bytes',
+        'MONGO_URI': None,
+        'TOKEN_REVOCATION_BACKEND': 'memory',
+        'PASSWORD_HASH_COST': 4,
+        'TESTING': True,
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    user = User(email='test@iquit.dev', username='test')
+    user.set_password('password123')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user):
+    return {'Authorization': f"Bearer {issue_tokens(user)['token']}"}
@@ -0,0 +1,36 @@
+import pytest
+
+ENTRY = {'substance_type': 'cigarette', 'quantity': 1, 'unit': 'unit', 'cost': 0.5}
+
+
+@pytest.mark.parametrize('field, value', [
+    ('quantity', 'abc'),
+    ('quantity', True),
+    ('cost', '0.5'),
+    ('unit', 'u' * 21),
+    ('substance_type', 's' * 51),
+    ('notes', 'n' * 256),
+    ('notes', 5),
+])
+def test_batch_marks_malformed_entry_invalid(client, auth_headers, field, value):
+    entries = [dict(ENTRY, idempotency_key='good-1'), dict(ENTRY, idempotency_key='bad', **{field: value}),
+               dict(ENTRY, idempotency_key='good-2')]
+    response = client.post('/consumption/batch', json=entries, headers=auth_headers)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [r['status'] for r in body['results']] == ['created', 'invalid', 'created']
+    assert field in body['results'][1]['message']
+    assert (body['created'], body['invalid']) == (2, 1)
+
+
+@pytest.mark.parametrize('field, value', [('quantity', 'abc'), ('cost', False), ('unit', 'u' * 21)])
+def test_log_rejects_malformed_entry(client, auth_headers, field, value):
+    response = client.post('/consumption', json=dict(ENTRY, **{field: value}), headers=auth_headers)
+    assert response.status_code == 400
+    assert field in response.get_json()['message']
+
+
+def test_log_stores_entry(client, auth_headers):
+    response = client.post('/consumption', json=ENTRY, headers=auth_headers)
+    assert response.status_code == 201
+    assert response.get_json()['id']
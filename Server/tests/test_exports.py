@@ -0,0 +1,19 @@
+from kombu.exceptions import OperationalError
+
+from app.services.export_service import EXPORT_FAILED, find_export
+from app.tasks import background_tasks
+
+
+def test_export_fails_cleanly_when_broker_is_down(app, client, auth_headers, user, tmp_path, monkeypatch):
+    app.config['EXPORT_DIR'] = str(tmp_path)
+    queued = []
+
+    def delay(user_id, export_id, *args):
+        queued.append(export_id)
+        raise OperationalError('broker unreachable')
+
+    monkeypatch.setattr(background_tasks.export_consumption, 'delay', delay)
+    response = client.post('/consumption/export', json={'format': 'csv'}, headers=auth_headers)
+    assert response.status_code == 503
+    assert find_export(str(tmp_path), user.id, queued[0])[0] == EXPORT_FAILED
+    assert client.get(f'/consumption/export/{queued[0]}', headers=auth_headers).status_code == 500
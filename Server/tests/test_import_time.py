@@ -0,0 +1,43 @@
+"""
+Cold-start imports of the web app and the Celery worker, profiled with
+``python -X importtime`` in fresh interpreters (benchmarks.import_time prints the
+same profile in detail). Each target must stay within its time budget and leave
+lazily loaded modules unimported. Scale the budgets on slow machines with
+IMPORT_TIME_BUDGET_SCALE, e.g. IMPORT_TIME_BUDGET_SCALE=2.
+"""
+import os
+
+import pytest
+
+from benchmarks.import_time import TARGETS, profile
+
+BUDGET_SCALE = float(os.getenv('IMPORT_TIME_BUDGET_SCALE', '1'))
+# best of this many cold starts, to ride out a busy machine
+RUNS = 3
+WORKER_LAZY = ('pymongo', 'flask_migrate', 'alembic', 'flask_cors', 'app.routes')
+
+# target: (budget in ms, modules that must not be imported)
+BUDGETS = {
+    'web': (1000, ('pymongo',)),
+    'worker': (800, WORKER_LAZY),
+    'worker_app': (800, WORKER_LAZY),
+}
+
+
+@pytest.fixture(scope='module', params=BUDGETS)
+def import_profile(request):
+    modules, total_us = min((profile(TARGETS[request.param]) for _ in range(RUNS)), key=lambda run: run[1])
+    return request.param, modules, total_us
+
+
+def test_import_time_within_budget(import_profile):
+    target, modules, total_us = import_profile
+    budget_ms, _ = BUDGETS[target]
+    assert total_us / 1000 <= budget_ms * BUDGET_SCALE
+
+
+def test_lazy_imports_stay_unloaded(import_profile):
+    target, modules, total_us = import_profile
+    _, lazy = BUDGETS[target]
+    loaded = [module for module in modules if any(module == name or module.startswith(name + '.') for name in lazy)]
+    assert loaded == []
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models.daily_rollup import DailyConsumptionRollup
+from app.services.consumption_service import insert_consumption, log_consumption_batch
+from app.services.partition_service import archive_months, purge_debug
+from app.services.rollup_service import rebuild_rollups
+
+NOW = datetime(2026, 6, 15, 12)
+
+
+def _rollup():
+    return sorted(
+        (r.user_id, r.day, r.substance_type, r.count, r.quantity_sum, r.cost_sum)
+        for r in DailyConsumptionRollup.query.all()
+    )
+
+
+@pytest.fixture
+def history(user):
+    for days in (1, 40, 400):
+        for is_debug in (False, True):
+            insert_consumption(user, {'timestamp': NOW - timedelta(days=days), 'substance_type': 'cigarette',
+                                      'quantity': 1.0, 'unit': 'unit', 'cost': 0.5, 'notes': None}, is_debug)
+    return user
+
+
+@pytest.mark.parametrize('drop', [
+    lambda: purge_debug(NOW - timedelta(days=30)),
+    lambda: archive_months(datetime(2026, 1, 1)),
+])
+def test_dropping_debug_rows_matches_rebuild(history, drop):
+    drop()
+    db.session.commit()
+    dropped = _rollup()
+    rebuild_rollups(history.id)
+    assert dropped == _rollup()
+
+
+def test_archived_keys_stay_duplicates(user):
+    entry = {'substance_type': 'cigarette', 'quantity': 1, 'unit': 'unit', 'idempotency_key': 'old',
+             'timestamp': '2020-01-05T10:00:00'}
+    created = log_consumption_batch(user, [entry])[0]
+    archive_months(datetime(2021, 1, 1))
+    db.session.commit()
+    assert log_consumption_batch(user, [entry])[0] == dict(created, status='duplicate')
@@ -0,0 +1,19 @@
+import pytest
+
+from app.services.password_service import BCRYPT_MAX_BYTES, _hash, _verify
+
+LONG = 'x' * BCRYPT_MAX_BYTES + 'tail'
+
+
+@pytest.mark.parametrize('algorithm, cost', [('bcrypt', 4), ('pbkdf2', 1000)])
+def test_long_passwords_use_every_byte(algorithm, cost):
+    password_hash = _hash(LONG, algorithm, cost)
+    assert _verify(password_hash, LONG)
+    assert not _verify(password_hash, 'x' * BCRYPT_MAX_BYTES + 'other')
+    assert not _verify(password_hash, 'x' * BCRYPT_MAX_BYTES)
+
+
+def test_long_password_login(client):
+    client.post('/auth/register', json={'email': 'long@iquit.dev', 'username': 'long', 'password': LONG})
+    assert client.post('/auth/login', json={'email': 'long@iquit.dev', 'password': LONG}).status_code == 200
+    assert client.post('/auth/login', json={'email': 'long@iquit.dev', 'password': LONG[:-1]}).status_code == 401
@@ -0,0 +1,45 @@
+from kombu.exceptions import OperationalError
+
+from app.extensions import db
+from app.models.user import User
+from app.tasks import background_tasks
+
+
+def test_update_without_body(client, auth_headers):
+    response = client.put('/user/profile', data='not json', headers=auth_headers)
+    assert response.status_code == 200
+
+
+def test_update_to_taken_email_conflicts(client, auth_headers, user):
+    db.session.add(User(email='taken@iquit.dev', username='taken', password_hash='x'))
+    db.session.commit()
+    response = client.put('/user/profile', json={'email': 'taken@iquit.dev'}, headers=auth_headers)
+    assert response.status_code == 409
+    assert client.get('/user/profile', headers=auth_headers).get_json()['email'] == user.email
+
+
+def test_timezone_change_queues_rollup_rebuild(client, auth_headers, user, monkeypatch):
+    queued = []
+    monkeypatch.setattr(background_tasks.rebuild_user_rollups, 'delay', queued.append)
+    response = client.put('/user/profile', json={'timezone': 'Europe/London'}, headers=auth_headers)
+    assert response.status_code == 200
+    assert queued == [user.id]
+
+
+def test_timezone_change_rebuilds_inline_without_broker(client, auth_headers, user, monkeypatch):
+    rebuilt = []
+
+    def delay(user_id):
+        raise OperationalError('broker unreachable')
+
+    monkeypatch.setattr(background_tasks.rebuild_user_rollups, 'delay', delay)
+    monkeypatch.setattr('app.routes.user.rebuild_rollups', rebuilt.append)
+    response = client.put('/user/profile', json={'timezone': 'Europe/London'}, headers=auth_headers)
+    assert response.status_code == 200
+    assert rebuilt == [user.id]
+
+
+def test_rebuild_task_rebuckets_history(client, auth_headers, user):
+    client.post('/consumption', json={'substance_type': 'cigarette', 'quantity': 1, 'unit': 'unit'},
+                headers=auth_headers)
+    assert background_tasks.rebuild_user_rollups(user.id) == 1
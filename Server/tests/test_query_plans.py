@@ -0,0 +1,60 @@
+"""
+Every SELECT a Consumption read path issues must search an index on SQLite
+rather than scan the consumption table.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, false
+
+from app.extensions import db
+from app.models.consumption import Consumption
+from app.services.aggregation_service import raw_daily_totals
+from app.services.consumption_service import get_today_consumptions
+
+ENDPOINTS = ['/consumption/today', '/consumption/weekly', '/stats/today', '/stats/weekly']
+
+
+@pytest.fixture
+def consumption_selects(user):
+    now = datetime.utcnow()
+    db.session.add_all([
+        Consumption(user_id=user.id, timestamp=now - timedelta(hours=i), substance_type='cigarette',
+                    quantity=1, unit='unit', cost=0.5)
+        for i in range(48)
+    ])
+    db.session.commit()
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'consumption' in statement and statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _scans(statement, parameters):
+    rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, tuple(parameters))
+    return [row[-1] for row in rows if row[-1].startswith('SCAN') and 'consumption' in row[-1]]
+
+
+def test_service_reads_use_indexes(user, consumption_selects):
+    get_today_consumptions(user)
+    raw_daily_totals(user.id, 7)
+    Consumption.query.filter(
+        Consumption.user_id == user.id,
+        Consumption.is_debug == false(),
+        Consumption.timestamp >= datetime.utcnow() - timedelta(days=7)
+    ).all()
+    assert consumption_selects
+    for statement, parameters in consumption_selects:
+        assert not _scans(statement, parameters), statement
+
+
+@pytest.mark.parametrize('path', ENDPOINTS)
+def test_endpoint_reads_use_indexes(client, auth_headers, consumption_selects, path):
+    assert client.get(path, headers=auth_headers).status_code == 200
+    for statement, parameters in consumption_selects:
+        assert not _scans(statement, parameters), statement
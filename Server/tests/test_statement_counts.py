@@ -0,0 +1,28 @@
+"""
+SQL statements per request for the authenticated endpoints. Access tokens carry
+the user's claims, so a cold current_user cache must stay within budget too.
+"""
+import pytest
+
+from app.extensions import db, user_cache
+from benchmarks.common import counting_statements
+
+# statements allowed per request
+BUDGETS = {
+    ('GET', '/user/profile'): 0,
+    ('GET', '/consumption/today'): 1,
+    ('GET', '/consumption/weekly'): 1,
+    ('GET', '/stats/today'): 1,
+    ('GET', '/stats/weekly'): 1,
+    ('GET', '/dashboard'): 2,
+}
+
+
+@pytest.mark.parametrize('method, path', BUDGETS)
+def test_statements_within_budget(client, auth_headers, method, path):
+    user_cache.clear()
+    for cache in ('cold', 'warm'):
+        with counting_statements(db.engine) as counter:
+            response = client.open(path, method=method, headers=auth_headers)
+        assert response.status_code == 200
+        assert counter['statements'] <= BUDGETS[method, path], cache
@@ -0,0 +1,98 @@
+"""
+Day and week bucketing across DST transitions: entries logged every 20 minutes
+around each transition are bucketed in SQL (raw path), through the incrementally
+maintained rollup and after a rollup rebuild, and compared with buckets computed
+in Python with zoneinfo.
+"""
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models.user import User
+from app.models.consumption import Consumption
+from app.services.aggregation_service import daily_totals, raw_daily_totals, raw_weekly_totals
+from app.services.rollup_service import record_consumptions, rebuild_rollups
+from app.services.timezone_service import local_date, utc_bounds
+
+# (zone, local date on which its clocks change in 2026)
+TRANSITIONS = [
+    ('UTC', date(2026, 3, 29)),
+    ('America/New_York', date(2026, 3, 8)),
+    ('America/New_York', date(2026, 11, 1)),
+    ('Europe/London', date(2026, 3, 29)),
+    ('Europe/London', date(2026, 10, 25)),
+    ('Australia/Lord_Howe', date(2026, 4, 5)),
+    ('Australia/Lord_Howe', date(2026, 10, 4)),
+    ('America/St_Johns', date(2026, 3, 8)),
+    ('America/St_Johns', date(2026, 11, 1)),
+    ('Asia/Kolkata', date(2026, 3, 29)),
+    ('Pacific/Kiritimati', date(2026, 3, 29)),
+]
+MARGIN_DAYS = 3
+STEP = timedelta(minutes=20)
+WEEKS = 3
+
+
+def _timestamps(first_day, last_day, tz_name):
+    start, end = utc_bounds(first_day, last_day, tz_name)
+    # start slightly outside the window so the bounds are exercised too
+    ts = start - timedelta(hours=2)
+    while ts < end + timedelta(hours=2):
+        yield ts
+        ts += STEP
+
+
+@pytest.fixture
+def logged(app, request):
+    tz_name, day = request.param
+    user = User(email='tz@iquit.dev', username='tz', timezone=tz_name)
+    db.session.add(user)
+    db.session.commit()
+    first, last = day - timedelta(days=MARGIN_DAYS), day + timedelta(days=MARGIN_DAYS)
+    rows = [
+        {'user_id': user.id, 'timestamp': ts, 'substance_type': 'cigarette', 'quantity': 1.0,
+         'unit': 'unit', 'cost': 0.5, 'is_debug': False}
+        for ts in _timestamps(first, last, tz_name)
+    ]
+    db.session.execute(Consumption.__table__.insert(), rows)
+    record_consumptions([Consumption(**row) for row in rows], tz_name)
+    db.session.commit()
+    expected = Counter(local_date(row['timestamp'], tz_name) for row in rows)
+    return user, tz_name, day, expected
+
+
+def _expected_days(expected, day):
+    first = day - timedelta(days=MARGIN_DAYS)
+    return [expected.get(first + timedelta(days=i), 0) for i in range(2 * MARGIN_DAYS + 1)]
+
+
+@pytest.mark.parametrize('logged', TRANSITIONS, indirect=True, ids=lambda t: f'{t[0]}-{t[1]}')
+def test_daily_buckets(logged):
+    user, tz_name, day, expected = logged
+    days, last = 2 * MARGIN_DAYS + 1, day + timedelta(days=MARGIN_DAYS)
+    assert [d['count'] for d in raw_daily_totals(user.id, days, last, tz_name)] == _expected_days(expected, day)
+    assert [d['count'] for d in daily_totals(user.id, days, last, tz_name)] == _expected_days(expected, day)
+    rebuild_rollups(user.id)
+    assert [d['count'] for d in daily_totals(user.id, days, last, tz_name)] == _expected_days(expected, day)
+
+
+@pytest.mark.parametrize('logged', TRANSITIONS, indirect=True, ids=lambda t: f'{t[0]}-{t[1]}')
+def test_transition_day_length(logged):
+    # the day follows the clock change (23, 23.5, 24, 24.5 or 25 hours)
+    user, tz_name, day, expected = logged
+    start, end = utc_bounds(day, day, tz_name)
+    assert expected[day] == pytest.approx((end - start).total_seconds() / 3600 * 3, abs=0.5)
+
+
+@pytest.mark.parametrize('logged', TRANSITIONS, indirect=True, ids=lambda t: f'{t[0]}-{t[1]}')
+def test_weekly_buckets(logged):
+    user, tz_name, day, expected = logged
+    week_counts = Counter()
+    for local_day, count in expected.items():
+        week_counts[local_day - timedelta(days=local_day.weekday())] += count
+    until = day + timedelta(days=7)
+    first_week = until - timedelta(days=until.weekday() + 7 * (WEEKS - 1))
+    expected_weeks = [week_counts.get(first_week + timedelta(weeks=i), 0) for i in range(WEEKS)]
+    assert [w['count'] for w in raw_weekly_totals(user.id, WEEKS, until, tz_name)] == expected_weeks